@@ -1,4 +1,8 @@
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -7,6 +11,9 @@ SECRET_KEY = '7ed0^_bf++n=7x(ml!qwa-(!c-fl5lh+(8_qmt%i%bpu^e5bm@'
 
 DEBUG = True
 
+# Set for manage.py test and pytest runs
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
 ALLOWED_HOSTS = [
     'localhost',
     '127.0.0.1',
@@ -33,11 +40,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ReplicaStickinessMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
@@ -47,13 +56,35 @@ INTERNAL_IPS = [
     '127.0.0.1',
 ]
 
+# Per-request costs (core.middleware.ServerTimingMiddleware): a JSON log
+# line for every request, and a Server-Timing header that exposes internal
+# timings, so it is sent to everyone only in DEBUG and otherwise to staff
+SERVER_TIMING_HEADER = DEBUG
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.timing': {
+            'handlers': ['console'],
+            'level': 'WARNING' if TESTING else 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 ROOT_URLCONF = 'BlogVoyage.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.timing.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -78,7 +109,35 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+        # Connections are reused between requests instead of reopened
+        'CONN_MAX_AGE': 60,
+    },
+    # Local stand-in for a read replica: a copy of the main database that
+    # `manage.py sync_replica` refreshes; tests read the main database
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'replica.sqlite3'),
+        'CONN_MAX_AGE': 60,
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# Feed and detail views read from these aliases when a copy is fresh enough
+DATABASE_REPLICAS = ['replica']
+REPLICA_SYNC_INTERVAL = 10
+REPLICA_MAX_LAG = 60
+# After a write the browser reads from the main database for this long
+REPLICA_STICKY_TIME = REPLICA_MAX_LAG
+
+# Applied by core.db to every new SQLite connection: WAL lets readers work
+# alongside a writer, NORMAL sync is durable enough with WAL, and writers
+# wait for the lock instead of failing with "database is locked"
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
 }
 
 
@@ -126,6 +185,18 @@ LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
+# Sessions and the session user are served from the cache; the session row
+# is written back to the database at most once per interval
+SESSION_ENGINE = 'core.sessions'
+SESSION_DB_WRITE_INTERVAL = 60 * 5
+# The plain ModelBackend stays as a fallback for sessions that were
+# authenticated by it
+AUTHENTICATION_BACKENDS = [
+    'core.auth.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+AUTH_USER_CACHE_TIME = 60 * 5
+
 # Email Backend
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
@@ -138,12 +209,68 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 # Cache framework
+# One file-based cache per host, shared by all WSGI worker processes
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
     }
 }
-CACHE_TIME = 20
+CACHE_TIME = 60 * 60 * 6
+
+# Test runs (manage.py test or pytest) use a throwaway cache file, so
+# cache.clear() in the suite never wipes the shared cache and its entries
+# never leak into tests
+if TESTING:
+    _test_cache_dir = tempfile.mkdtemp(prefix='blogvoyage-cache-')
+    atexit.register(shutil.rmtree, _test_cache_dir, ignore_errors=True)
+    CACHES['default']['LOCATION'] = os.path.join(
+        _test_cache_dir, 'cache.sqlite3'
+    )
+# Page cache stampede protection: how long an expired page may still be
+# served while one worker rebuilds it, how long that worker holds the
+# rebuild lock, how long others with no copy wait for it, and how eagerly
+# pages are rebuilt before expiry (0 disables early rebuilds)
+PAGE_STALE_TIME = 60 * 5
+PAGE_LOCK_TIME = 30
+PAGE_LOCK_WAIT = 5
+PAGE_EARLY_BETA = 1.0
+# Post-deploy cache warming (posts.warming): run it in the background when
+# the WSGI application starts, how many index pages and most active author
+# profiles to render, and how many requests run at once
+WARM_CACHE_ON_STARTUP = False
+WARM_CACHE_PAGES = 5
+WARM_CACHE_PROFILES = 50
+WARM_CACHE_WORKERS = 4
 
 # Paginator settings
 POSTS_PER_PAGE = 10
+FEED_ITEMS = 20
+COMMENTS_PER_PAGE = 20
+
+# Follow timeline settings
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_BACKFILL = 200
+TIMELINE_HOT_AUTHORS_TIME = 60 * 10
+
+# Cached per-user followee lists used for follow checks
+FOLLOW_GRAPH_TIME = 60 * 60 * 24
+
+# Thumbnail pre-generation: geometries used by templates and worker pool size
+THUMBNAIL_PRESETS = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+THUMBNAIL_WORKERS = 2
+
+# Rows removed per transaction by posts.deletion
+DELETION_BATCH_SIZE = 1000
+
+# Image ingest limits
+FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024
+IMAGE_UPLOAD_MAX_SIZE = 20 * 1024 * 1024
+IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+IMAGE_MAX_SIDE = 1920
+IMAGE_QUALITY = 85
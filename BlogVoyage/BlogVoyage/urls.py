@@ -11,7 +11,7 @@ urlpatterns = [
     path('', include('posts.urls', namespace='posts'))
 ]
 handler404 = 'core.views.page_not_found'
-handler403 = 'core.views.csrf_failure'
+handler403 = 'core.views.permission_denied'
 
 if settings.DEBUG:
     import debug_toolbar
@@ -1,7 +1,13 @@
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'BlogVoyage.settings')
 
 application = get_wsgi_application()
+
+if settings.WARM_CACHE_ON_STARTUP:
+    from posts.warming import warm_in_background
+
+    warm_in_background()
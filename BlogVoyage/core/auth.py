@@ -0,0 +1,60 @@
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+USER_KEY = 'auth_user:{}'
+
+
+def _session_auth_hash(user, cached):
+    # Пока пароль не загружен и не менялся, хэш сессии берём из кэша;
+    # после set_password он считается заново по новому паролю
+    if 'password' in user.get_deferred_fields():
+        return cached
+    return type(user).get_session_auth_hash(user)
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который берёт пользователя сессии из кэша.
+
+    В кэше лежат поля пользователя без пароля и готовый хэш сессии:
+    хэш пароля в общий кэш на диске не попадает. Пароль у такого
+    пользователя отложен и читается из базы при первом обращении.
+
+    Запись живёт AUTH_USER_CACHE_TIME секунд и удаляется при любом
+    сохранении пользователя, в том числе при смене пароля: иначе
+    хэш сессии сверялся бы со старым паролем.
+    """
+
+    def get_user(self, user_id):
+        key = USER_KEY.format(user_id)
+        entry = cache.get(key)
+        if entry is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            fields = {
+                field.attname: getattr(user, field.attname)
+                for field in user._meta.concrete_fields
+                if field.attname != 'password'
+            }
+            entry = (user._state.db, fields, user.get_session_auth_hash())
+            cache.set(key, entry, settings.AUTH_USER_CACHE_TIME)
+        db, fields, session_hash = entry
+        user = get_user_model().from_db(
+            db, list(fields), list(fields.values())
+        )
+        user.get_session_auth_hash = partial(
+            _session_auth_hash, user, session_hash
+        )
+        return user if self.user_can_authenticate(user) else None
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_cached_user(sender, instance, **kwargs):
+    cache.delete(USER_KEY.format(instance.pk))
@@ -0,0 +1,239 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS cache (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        expires REAL,
+        accessed REAL NOT NULL
+    ) WITHOUT ROWID""",
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)',
+)
+ALIVE = '(expires IS NULL OR expires > ?)'
+
+
+def _placeholders(values):
+    return ','.join('?' * len(values))
+
+
+def _chunks(values, size):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в файле SQLite, общий для всех процессов на хосте.
+
+    Файл открывается в режиме WAL, поэтому читатели не блокируют друг
+    друга и писателя. Целые числа хранятся как INTEGER, что делает incr
+    атомарным одним UPDATE; остальные значения сериализуются pickle.
+    При превышении MAX_ENTRIES вытесняются давно не читавшиеся ключи.
+    """
+
+    # Время последнего чтения обновляется не чаще, чем раз в столько секунд
+    ACCESS_RESOLUTION = 10
+    CULL_EVERY = 50
+    # Ключей в одном запросе: старые сборки SQLite принимают не больше
+    # 999 параметров
+    MAX_KEYS = 900
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+        self._writes = 0
+
+    @property
+    def _db(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self._path, timeout=30, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @staticmethod
+    def _encode(value):
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _decode(value):
+        if isinstance(value, bytes):
+            return pickle.loads(value)
+        return value
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        by_cache_key = {self._key(key, version): key for key in keys}
+        now = time.time()
+        rows = []
+        for chunk in _chunks(by_cache_key, self.MAX_KEYS):
+            rows.extend(self._db.execute(
+                f'SELECT key, value, accessed FROM cache '
+                f'WHERE key IN ({_placeholders(chunk)}) AND {ALIVE}',
+                (*chunk, now)
+            ).fetchall())
+        stale = [
+            key for key, _, accessed in rows
+            if accessed < now - self.ACCESS_RESOLUTION
+        ]
+        for chunk in _chunks(stale, self.MAX_KEYS):
+            self._db.execute(
+                f'UPDATE cache SET accessed = ? '
+                f'WHERE key IN ({_placeholders(chunk)})',
+                (now, *chunk)
+            )
+        return {
+            by_cache_key[key]: self._decode(value) for key, value, _ in rows
+        }
+
+    def has_key(self, key, version=None):
+        return self._db.execute(
+            f'SELECT 1 FROM cache WHERE key = ? AND {ALIVE}',
+            (self._key(key, version), time.time())
+        ).fetchone() is not None
+
+    def _store(self, rows, timeout):
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            db.executemany(
+                'INSERT OR REPLACE INTO cache (key, value, expires, accessed) '
+                'VALUES (?, ?, ?, ?)',
+                [
+                    (key, self._encode(value), expires, now)
+                    for key, value in rows
+                ]
+            )
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        self._writes += len(rows)
+        if self._writes >= self.CULL_EVERY:
+            self._writes = 0
+            self._cull(now)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._store([(self._key(key, version), value)], timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        self._store(
+            [(self._key(key, version), value) for key, value in data.items()],
+            timeout
+        )
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            db.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?', (key, now)
+            )
+            added = db.execute(
+                'INSERT OR IGNORE INTO cache (key, value, expires, accessed) '
+                'VALUES (?, ?, ?, ?)',
+                (key, self._encode(value), self.get_backend_timeout(timeout),
+                 now)
+            ).rowcount == 1
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._db.execute(
+            f'UPDATE cache SET expires = ? WHERE key = ? AND {ALIVE}',
+            (
+                self.get_backend_timeout(timeout),
+                self._key(key, version),
+                time.time(),
+            )
+        ).rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            updated = db.execute(
+                f'UPDATE cache SET value = value + ? WHERE key = ? '
+                f"AND typeof(value) = 'integer' AND {ALIVE}",
+                (delta, key, time.time())
+            ).rowcount
+            value = db.execute(
+                'SELECT value FROM cache WHERE key = ?', (key,)
+            ).fetchone() if updated else None
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        if value is None:
+            raise ValueError("Key '%s' not found" % key)
+        return value[0]
+
+    def delete(self, key, version=None):
+        self._db.execute(
+            'DELETE FROM cache WHERE key = ?', (self._key(key, version),)
+        )
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        for chunk in _chunks(keys, self.MAX_KEYS):
+            self._db.execute(
+                f'DELETE FROM cache WHERE key IN ({_placeholders(chunk)})',
+                chunk
+            )
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache')
+
+    def _cull(self, now):
+        db = self._db
+        db.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+        count = db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count > self._max_entries:
+            excess = count - self._max_entries
+            if self._cull_frequency:
+                excess = max(excess, count // self._cull_frequency)
+            db.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                (excess,)
+            )
+
+    def close(self, **kwargs):
+        # Соединение живёт весь срок жизни потока, как у CONN_MAX_AGE=None
+        pass
@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from ... import replica
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу в локальные реплики, однократно '
+        'или с заданным интервалом'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=settings.REPLICA_SYNC_INTERVAL,
+            help='Пауза между копированиями, секунды'
+        )
+        parser.add_argument(
+            '--once', action='store_true', help='Скопировать один раз и выйти'
+        )
+
+    def handle(self, *args, **options):
+        aliases = settings.DATABASE_REPLICAS
+        if not aliases:
+            raise CommandError('В DATABASE_REPLICAS нет реплик')
+        for alias in aliases:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f'Реплика {alias} не в SQLite')
+        while True:
+            for alias in aliases:
+                started = time.perf_counter()
+                replica.sync(alias)
+                self.stdout.write(
+                    f'{alias}: скопировано за '
+                    f'{(time.perf_counter() - started) * 1000:.0f} мс'
+                )
+            if options['once']:
+                return
+            time.sleep(options['interval'])
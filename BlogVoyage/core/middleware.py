@@ -0,0 +1,95 @@
+import json
+import logging
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+
+from .replica import STICKY_COOKIE
+from .timing import RequestTiming, current_timing
+
+logger = logging.getLogger('core.timing')
+
+
+class ServerTimingMiddleware:
+    """Отдаёт затраты запроса в заголовке Server-Timing и в журнал.
+
+    Ставится первым в MIDDLEWARE, чтобы total включал все остальные
+    слои. На запрос приходится пара вызовов perf_counter на каждый
+    SQL-запрос и рендер шаблона, поэтому его можно не выключать.
+    Заголовок раскрывает внутренние затраты, поэтому без
+    SERVER_TIMING_HEADER его получают только сотрудники.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timing))
+                response = self.get_response(request)
+        finally:
+            current_timing.reset(token)
+        metrics = timing.metrics()
+        if self.show_header(request):
+            response['Server-Timing'] = self.header(metrics, timing.queries)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'queries': timing.queries,
+                **{
+                    f'{name}_ms': round(value, 2)
+                    for name, value in metrics.items()
+                },
+            }))
+        return response
+
+    @staticmethod
+    def show_header(request):
+        if settings.SERVER_TIMING_HEADER:
+            return True
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_staff
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = current_timing.get()
+        if timing is not None:
+            timing.view_started = perf_counter()
+
+    @staticmethod
+    def header(metrics, queries):
+        # Заголовки передаются в latin-1, поэтому описания на английском
+        entries = []
+        for name, value in metrics.items():
+            entry = f'{name};dur={value:.2f}'
+            if name == 'db':
+                entry += f';desc="{queries} queries"'
+            entries.append(entry)
+        return ', '.join(entries)
+
+
+class ReplicaStickinessMiddleware:
+    """После успешной записи браузер REPLICA_STICKY_TIME секунд читает
+    с основной базы и видит свои изменения, пока реплика отстаёт."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            request.method not in ('GET', 'HEAD', 'OPTIONS')
+            and response.status_code < 400
+        ):
+            response.set_cookie(
+                STICKY_COOKIE, '1', max_age=settings.REPLICA_STICKY_TIME,
+                httponly=True, samesite='Lax',
+            )
+        return response
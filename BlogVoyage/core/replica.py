@@ -0,0 +1,124 @@
+import random
+import sqlite3
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+
+SYNCED_KEY = 'replica:{}:synced_at'
+LAST_WRITE_KEY = 'replica:last_write'
+SCOPE_WRITE_KEY = 'replica:last_write:{}'
+STICKY_COOKIE = 'read_primary'
+
+# Пара (псевдоним реплики, отстаёт ли она от записей) на время
+# представления, обёрнутого replica_reads
+current_replica = ContextVar('current_replica', default=None)
+# Области кэша страницы, которую сейчас собирает кэш страниц: отставание
+# реплики считается только по записям в них
+page_scopes = ContextVar('page_scopes', default=None)
+
+
+def reading_stale_replica():
+    """Читаются ли сейчас данные с копии, снятой до последней записи
+    в областях страницы (или до любой записи вне кэша страниц).
+
+    Собранное по такой копии нельзя класть в кэш под текущими
+    поколениями: оно осталось бы там и после синхронизации.
+    """
+    replica = current_replica.get()
+    return replica is not None and replica[1]
+
+
+def record_write(*scopes):
+    """Запоминает время последней записи — общее и для каждой области.
+
+    Время ставится после фиксации транзакции, иначе копия, снятая
+    между записью и COMMIT, считалась бы свежей.
+    """
+    def record():
+        now = time.time()
+        cache.set_many({
+            LAST_WRITE_KEY: now,
+            **{SCOPE_WRITE_KEY.format(scope): now for scope in scopes},
+        }, None)
+    transaction.on_commit(record)
+
+
+def sync(alias):
+    """Копирует основную базу в файл реплики через backup API SQLite.
+
+    Локальная замена настоящей репликации: копия согласована на момент
+    начала копирования, а открытые соединения реплики видят её со
+    следующей транзакции.
+    """
+    started = time.time()
+    primary = connections['default']
+    primary.ensure_connection()
+    target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+    try:
+        primary.connection.backup(target)
+    finally:
+        target.close()
+    cache.set(SYNCED_KEY.format(alias), started, None)
+
+
+def choose():
+    """Случайная реплика не старше REPLICA_MAX_LAG и признак того,
+    что после её копирования уже была запись.
+
+    Для страницы из кэша страниц учитываются только записи в её
+    областях: при постоянном потоке записей любая копия отставала бы
+    от последней из них, и кэш не заполнялся бы вовсе.
+    """
+    aliases = settings.DATABASE_REPLICAS
+    if not aliases:
+        return None, False
+    scopes = page_scopes.get()
+    write_keys = [LAST_WRITE_KEY] if scopes is None else [
+        SCOPE_WRITE_KEY.format(scope) for scope in scopes
+    ]
+    found = cache.get_many(
+        [SYNCED_KEY.format(alias) for alias in aliases] + write_keys
+    )
+    now = time.time()
+    fresh = [
+        alias for alias in aliases
+        if now - found.get(SYNCED_KEY.format(alias), 0)
+        <= settings.REPLICA_MAX_LAG
+    ]
+    if not fresh:
+        return None, False
+    alias = random.choice(fresh)
+    synced_at = found[SYNCED_KEY.format(alias)]
+    last_write = max(found.get(key, 0) for key in write_keys)
+    return alias, synced_at < last_write
+
+
+def replica_reads(view):
+    """Отправляет чтения представления на реплику.
+
+    Браузер, который недавно что-то записал, читает с основной базы.
+    Ответ, собранный по отставшей копии, помечается ``stale_replica``,
+    чтобы его не сохранил кэш страниц.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (
+            request.method not in ('GET', 'HEAD')
+            or STICKY_COOKIE in request.COOKIES
+        ):
+            return view(request, *args, **kwargs)
+        alias, stale = choose()
+        if alias is None:
+            return view(request, *args, **kwargs)
+        token = current_replica.set((alias, stale))
+        try:
+            response = view(request, *args, **kwargs)
+        finally:
+            current_replica.reset(token)
+        response.stale_replica = stale
+        return response
+    return wrapper
@@ -0,0 +1,21 @@
+from .replica import current_replica
+
+
+class ReplicaRouter:
+    """Чтения внутри replica_reads идут на выбранную реплику,
+    всё остальное — на основную базу."""
+
+    def db_for_read(self, model, **hints):
+        replica = current_replica.get()
+        return replica[0] if replica is not None else 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика — копия основной базы, связи между ними допустимы
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схема попадает на реплику вместе с копией
+        return db == 'default'
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.contrib.sessions.backends.base import UpdateError
+from django.contrib.sessions.backends.cached_db import \
+    SessionStore as CachedDBStore
+
+
+class SessionStore(CachedDBStore):
+    """Сессии в кэше с отложенной записью в базу.
+
+    Чтение идёт из кэша, как у cached_db. Каждое сохранение обновляет
+    кэш, а строку в базе — не чаще раза в SESSION_DB_WRITE_INTERVAL
+    секунд. Новые сессии и смена ключа при входе пишутся в базу сразу.
+    Если запись вытеснят из кэша раньше, потеряются только изменения
+    за последний интервал.
+    """
+
+    def _synced_key(self, session_key):
+        return f'{self.cache_key_prefix}{session_key}:synced'
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        if must_create:
+            super().save(must_create=True)
+            self._cache.set(
+                self._synced_key(self.session_key), True,
+                settings.SESSION_DB_WRITE_INTERVAL
+            )
+            return
+        if self.cache_key not in self._cache:
+            # Сессию вытеснили из кэша или удалили при выходе: пишем
+            # в базу, как cached_db, и отсутствие строки даст ошибку
+            super().save()
+            return
+        # add() атомарен: в базу пишет только первый запрос интервала
+        if not self._cache.add(
+            self._synced_key(self.session_key), True,
+            settings.SESSION_DB_WRITE_INTERVAL
+        ):
+            self._cache.set(
+                self.cache_key, self._session, self.get_expiry_age()
+            )
+            return
+        try:
+            super().save()
+        except UpdateError:
+            # Строку удалил clearsessions по отставшему сроку истечения,
+            # а в кэше сессия ещё жива
+            super().save(must_create=True)
+
+    def delete(self, session_key=None):
+        key = session_key or self.session_key
+        super().delete(session_key)
+        if key is not None:
+            self._cache.delete(self._synced_key(key))
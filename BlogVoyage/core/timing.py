@@ -0,0 +1,74 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.template.backends.django import DjangoTemplates, Template
+
+current_timing = ContextVar('current_timing', default=None)
+
+
+class RequestTiming:
+    """Накопитель затрат одного запроса.
+
+    Экземпляр подключается к соединениям как execute_wrapper и считает
+    запросы к базе; время шаблонов добавляет TimedDjangoTemplates.
+    """
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.view_started = None
+        self.queries = 0
+        self.db = 0.0
+        self.template = 0.0
+        self._depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += perf_counter() - started
+            self.queries += 1
+
+    @contextmanager
+    def rendering(self):
+        # Вложенные render_to_string уже входят во внешний рендер
+        self._depth += 1
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if not self._depth:
+                self.template += perf_counter() - started
+
+    def metrics(self):
+        """Длительности в миллисекундах."""
+        finished = perf_counter()
+        view = finished - self.view_started if self.view_started else 0.0
+        return {
+            'total': (finished - self.started) * 1000,
+            'view': view * 1000,
+            'db': self.db * 1000,
+            'tpl': self.template * 1000,
+        }
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timing = current_timing.get()
+        if timing is None:
+            return super().render(context, request)
+        with timing.rendering():
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Шаблонизатор Django, который отчитывается о времени рендера."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
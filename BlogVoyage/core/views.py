@@ -8,4 +8,9 @@ def page_not_found(request, exception):
 
 def csrf_failure(request, reason=''):
     template = 'core/403csrf.html'
-    return render(request, template)
+    return render(request, template, status=403)
+
+
+def permission_denied(request, exception):
+    template = 'core/403.html'
+    return render(request, template, {'path': request.path}, status=403)
@@ -1,16 +1,84 @@
 from django.contrib import admin
+from django.contrib.auth import get_permission_codename, get_user_model
+from django.contrib.auth.admin import UserAdmin
+from django.db.models.expressions import RawSQL
 
+from . import deletion, search
 from .models import Comment, Group, Post
 
+User = get_user_model()
 
-class PostAdmin(admin.ModelAdmin):
+
+class BatchDeleteAdmin(admin.ModelAdmin):
+    """Удаление через posts.deletion: связанные строки уходят пачками.
+
+    ``deletion_scope`` — ``'posts'`` или ``'users'``, по нему выбирается
+    функция удаления. Действие «Удалить выбранные» и страница удаления
+    объекта показывают только число затронутых строк каждой модели,
+    а не полный список, для которого админка загрузила бы их все.
+    """
+    deletion_scope = None
+
+    def delete_in_batches(self, queryset):
+        return getattr(deletion, f'delete_{self.deletion_scope}')(queryset)
+
+    def delete_view(self, request, object_id, extra_context=None):
+        # Без общей транзакции админки: каждая пачка фиксируется сама,
+        # иначе удаление снова держало бы блокировку до конца
+        return self._delete_view(request, object_id, extra_context)
+
+    def get_deleted_objects(self, objs, request):
+        objs = list(objs)
+        queryset = self.model.objects.filter(pk__in=[obj.pk for obj in objs])
+        counts = deletion.summarize(**{self.deletion_scope: queryset})
+        counts[self.model] = len(objs)
+        model_count = {}
+        perms_needed = set()
+        for model, count in counts.items():
+            if not count:
+                continue
+            opts = model._meta
+            model_count[opts.verbose_name_plural] = count
+            codename = get_permission_codename('delete', opts)
+            if not request.user.has_perm(f'{opts.app_label}.{codename}'):
+                perms_needed.add(opts.verbose_name)
+        return [str(obj) for obj in objs], model_count, perms_needed, []
+
+    def delete_model(self, request, obj):
+        # Об удалении объекта сообщает сама страница удаления
+        self.delete_in_batches(self.model.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        deleted = self.delete_in_batches(queryset)
+        self.message_user(request, 'Удалено: ' + ', '.join(
+            f'{label.lower()} — {count}' for label, count in deleted.items()
+        ))
+
+
+class PostAdmin(BatchDeleteAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
     list_editable = ('group',)
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
+    deletion_scope = 'posts'
+
+    def get_search_results(self, request, queryset, search_term):
+        expression = search.match_expression(search_term)
+        if not expression or not search.available():
+            return super().get_search_results(request, queryset, search_term)
+        queryset = queryset.filter(
+            pk__in=RawSQL(search.matching_ids_sql(), (expression,))
+        )
+        return queryset, False
+
+
+class BatchDeleteUserAdmin(BatchDeleteAdmin, UserAdmin):
+    deletion_scope = 'users'
 
 
 admin.site.register(Post, PostAdmin)
+admin.site.unregister(User)
+admin.site.register(User, BatchDeleteUserAdmin)
 admin.site.register(Group)
 admin.site.register(Comment)
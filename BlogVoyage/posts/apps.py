@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PostsConfig(AppConfig):
     name = 'posts'
     verbose_name = 'Блоггинг'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
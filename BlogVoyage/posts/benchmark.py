@@ -0,0 +1,292 @@
+import json
+import os
+import platform
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection, connections
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Group, Post
+from .paginator import CursorPaginator
+from .seeding import Seeder, fill_timelines
+from .timeline import follow_feed
+
+User = get_user_model()
+
+VIEWS = ('index', 'group_posts', 'profile', 'post_detail', 'follow_index')
+# По умолчанию меряем промахи кэша страниц: это худший случай
+NO_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+}
+
+
+class Target:
+    """Страница для замера: адрес, зритель и источник курсоров."""
+
+    def __init__(self, view, url, queryset=None, fields=('pub_date', 'pk'),
+                 user=None):
+        self.view = view
+        self.url = url
+        self.queryset = queryset
+        self.fields = fields
+        self.user = user
+
+    def query_string(self, depth):
+        if depth == 1 or self.queryset is None:
+            return ''
+        # Курсор получаем заранее, замеряется только сам переход
+        page = CursorPaginator(
+            self.queryset, settings.POSTS_PER_PAGE, self.fields
+        ).page_by_number(depth - 1)
+        if not page.has_next():
+            return None
+        return f'?after={page.next_cursor()}'
+
+
+@contextmanager
+def database(path):
+    """Подключает отдельную базу на диске, созданную как тестовая."""
+    creation = connection.creation
+    original_name = connection.settings_dict['NAME']
+    connection.settings_dict['TEST']['NAME'] = path
+    creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False, keepdb=True
+    )
+    try:
+        yield
+    finally:
+        creation.destroy_test_db(original_name, verbosity=0, keepdb=True)
+
+
+def seed(size, path):
+    # Генерируем во временный файл, чтобы прерванный запуск
+    # не оставил недозаполненную базу
+    partial = f'{path}.partial'
+    if os.path.exists(partial):
+        os.remove(partial)
+    with database(partial):
+        Seeder(size).run()
+        fill_timelines([reader().pk])
+    os.replace(partial, path)
+
+
+def reader():
+    # Читатель с самым большим числом подписок
+    return User.objects.order_by('-counters__following_count').first()
+
+
+def targets():
+    """Самые тяжёлые страницы каждого вида в текущей базе."""
+    group = Group.objects.annotate(total=Count('posts')).order_by(
+        '-total'
+    ).first()
+    author = User.objects.order_by('-counters__posts_count').first()
+    post = Post.objects.order_by('-comments_count').first()
+    user = reader()
+    feed, fields = follow_feed(user)
+    return [
+        Target('index', reverse('posts:index'), Post.objects.all()),
+        Target(
+            'group_posts',
+            reverse('posts:group_list', args=[group.slug]),
+            group.posts.all(),
+        ),
+        Target(
+            'profile',
+            reverse('posts:profile', args=[author.username]),
+            author.posts.all(),
+        ),
+        Target('post_detail', reverse('posts:post_detail', args=[post.pk])),
+        Target(
+            'follow_index', reverse('posts:follow_index'), feed, fields,
+            user=user,
+        ),
+    ]
+
+
+def percentile(samples, percent):
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method='inclusive')[
+        percent - 1
+    ]
+
+
+def measure(target, depth, iterations, warmup=3):
+    query_string = target.query_string(depth)
+    if query_string is None:
+        return None
+    client = Client()
+    if target.user is not None:
+        client.force_login(target.user)
+    url = target.url + query_string
+    for _ in range(warmup):
+        client.get(url)
+    timings = []
+    queries = []
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f'{url} ответил {response.status_code}')
+        queries.append(len(captured))
+    return {
+        'view': target.view,
+        'depth': depth,
+        'p50_ms': round(statistics.median(timings), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'queries': max(queries),
+    }
+
+
+def run(size, depths, iterations, views=VIEWS):
+    results = []
+    for target in targets():
+        if target.view not in views:
+            continue
+        for depth in depths if target.queryset is not None else (1,):
+            result = measure(target, depth, iterations)
+            if result is not None:
+                results.append(dict(result, posts=size))
+    return results
+
+
+def _summary(timings, errors, duration):
+    return {
+        'ops_per_sec': round(len(timings) / duration, 1),
+        'p50_ms': round(statistics.median(timings), 3) if timings else None,
+        'p99_ms': round(percentile(timings, 99), 3) if timings else None,
+        'errors': errors,
+    }
+
+
+def _load_worker(action, client, deadline):
+    timings = []
+    errors = 0
+    try:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                action(client)
+            except OperationalError:
+                errors += 1
+                continue
+            timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        connections.close_all()
+    return timings, errors
+
+
+def mixed_load(duration, readers, writers, random_seed=0):
+    """Смешанная нагрузка из нескольких потоков на текущую базу.
+
+    Читатели открывают главную страницу и ленты групп и авторов,
+    писатели добавляют комментарии через форму. Каждое действие
+    проходит полный цикл запроса, поэтому учитываются и открытие
+    соединений, и блокировки SQLite. Ошибки «database is locked»
+    считаются отдельно.
+    """
+    rng = random.Random(random_seed)
+    urls = [target.url for target in targets() if target.user is None]
+    comment_urls = [
+        reverse('posts:add_comment', args=[pk])
+        for pk in Post.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        )[:1000]
+    ]
+
+    def read(client):
+        client.get(rng.choice(urls))
+
+    def write(client):
+        client.post(rng.choice(comment_urls), {'text': 'Нагрузочный тест'})
+
+    clients = {'read': [], 'write': []}
+    for _ in range(readers):
+        clients['read'].append((read, Client()))
+    for user in User.objects.order_by('pk')[:writers]:
+        client = Client()
+        client.force_login(user)
+        clients['write'].append((write, client))
+    deadline = time.perf_counter() + duration
+    with ThreadPoolExecutor(readers + writers) as pool:
+        futures = {
+            kind: [
+                pool.submit(_load_worker, action, client, deadline)
+                for action, client in workers
+            ]
+            for kind, workers in clients.items()
+        }
+        result = {}
+        for kind, kind_futures in futures.items():
+            outcomes = [future.result() for future in kind_futures]
+            result[kind] = _summary(
+                [timing for timings, _ in outcomes for timing in timings],
+                sum(errors for _, errors in outcomes),
+                duration,
+            )
+    return result
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'sqlite': connection.Database.sqlite_version
+        if connection.vendor == 'sqlite' else None,
+        'machine': platform.machine(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def _key(result):
+    return result['posts'], result['view'], result['depth']
+
+
+def compare(results, baseline, tolerance):
+    """Список регрессий относительно сохранённого прогона.
+
+    Число запросов не должно расти вовсе, p50 может превышать базовую
+    задержку не больше чем на tolerance (доля), а более шумный p99 —
+    на удвоенный допуск.
+    """
+    previous = {_key(result): result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        old = previous.get(_key(result))
+        if old is None:
+            continue
+        if result['queries'] > old['queries']:
+            regressions.append(
+                (result, 'queries', old['queries'], result['queries'])
+            )
+        for metric, factor in (('p50_ms', 1), ('p99_ms', 2)):
+            if result[metric] > old[metric] * (1 + tolerance * factor):
+                regressions.append(
+                    (result, metric, old[metric], result[metric])
+                )
+    return regressions
+
+
+def load(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def dump(report, path):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+        file.write('\n')
@@ -0,0 +1,267 @@
+import hashlib
+import math
+import random
+import time
+from functools import partial, wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+
+from core import replica
+
+from .models import Post
+
+GENERATION_KEY = 'generation:{}'
+PAGE_KEY = 'page:{}'
+PAGE_LOCK_KEY = 'page:lock:{}'
+POST_AUTHOR_KEY = 'post_author:{}'
+GLOBAL_SCOPE = 'site'
+
+
+def _initial_generation():
+    # Начинаем с отметки времени, чтобы вытесненное из кэша поколение
+    # не совпало со старым значением и не оживило устаревшие страницы
+    return int(time.time() * 1000)
+
+
+def get_generations(scopes):
+    keys = [GENERATION_KEY.format(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _initial_generation(), None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def _increment(scopes):
+    for scope in scopes:
+        key = GENERATION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_generation(), None)
+
+
+def bump(*scopes):
+    """Повышает поколения областей сразу и ещё раз после фиксации.
+
+    Страница, собранная другим запросом между записью и COMMIT, видит
+    прежние строки, но уже новое поколение; второе повышение не даёт
+    ей остаться в кэше.
+    """
+    replica.record_write(*scopes)
+    _increment(scopes)
+    transaction.on_commit(lambda: _increment(scopes))
+
+
+def post_scopes(post_id):
+    """Области страницы поста: сам пост и его автор.
+
+    На странице выводятся счётчики автора, которые меняют его другие
+    посты и подписки. Автор у поста не меняется, поэтому его id
+    берётся из кэша, и попадание в кэш страниц обходится без базы.
+    """
+    key = POST_AUTHOR_KEY.format(post_id)
+    author_id = cache.get(key)
+    if author_id is None:
+        author_id = Post.objects.filter(pk=post_id).values_list(
+            'author_id', flat=True
+        ).first()
+        if author_id is not None:
+            cache.set(key, author_id, None)
+    return (f'post:{post_id}', f'author:{author_id}')
+
+
+def card_scopes(post):
+    # Смена имени автора повышает поколение всего сайта, поэтому
+    # отдельной области автора у карточки нет
+    return (f'card:post:{post.pk}', f'card:group:{post.group_id}')
+
+
+def _viewer(request):
+    if not request.user.is_authenticated:
+        return ''
+    csrf_token = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+    return f'{request.user.pk}:{csrf_token}'
+
+
+def page_digest(request, scopes):
+    generations = get_generations((GLOBAL_SCOPE,) + tuple(scopes))
+    raw = '|'.join((
+        ','.join(map(str, generations)),
+        request.get_full_path(),
+        _viewer(request),
+    ))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def page_id(request):
+    # Одна запись кэша на адрес и зрителя: после смены поколения в ней
+    # остаётся прежняя копия, которую можно отдать, пока собирается новая
+    raw = f'{request.get_full_path()}|{_viewer(request)}'
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def _revalidate(request, response):
+    # Браузер хранит копию, но каждый раз сверяет её с сервером
+    patch_cache_control(
+        response, no_cache=True, private=request.user.is_authenticated
+    )
+    return response
+
+
+def _fresh(entry, digest):
+    """Можно ли отдать запись без пересборки.
+
+    Запись пересобирается заранее с вероятностью, растущей к концу её
+    срока и со временем сборки (XFetch), поэтому истечение популярной
+    страницы не приходится на все запросы разом.
+    """
+    entry_digest, _, expires, delta = entry
+    early = -delta * settings.PAGE_EARLY_BETA * math.log(
+        1 - random.random()
+    )
+    return entry_digest == digest and time.time() + early < expires
+
+
+def _wait_for_page(key, lock, digest):
+    """Ждёт страницу, которую собирает владелец блокировки.
+
+    Если блокировка снята, а записи нужного поколения нет, страница
+    в кэш не попала (ответ с cookie, не 200 или собранный по отставшей
+    реплике), и ждать её до PAGE_LOCK_WAIT бесполезно.
+    """
+    deadline = time.monotonic() + settings.PAGE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        found = cache.get_many([key, lock])
+        entry = found.get(key)
+        if entry is not None and entry[0] == digest:
+            return entry[1]
+        if lock not in found:
+            return None
+    return None
+
+
+def _last_modified(previous, digest):
+    """Время изменения для новой сборки страницы.
+
+    Берётся время сборки, а не дата последнего поста: правка и удаление
+    даты постов не двигают. Секундной точности не хватает, чтобы
+    различить две сборки в одну секунду, поэтому время новой сборки
+    строго больше, чем у прежней копии другого поколения.
+    """
+    modified = int(time.time())
+    if previous is not None and previous[0] != digest:
+        before = parse_http_date_safe(previous[1].get('Last-Modified', ''))
+        if before is not None:
+            modified = max(modified, before + 1)
+    return modified
+
+
+def _render(render, key, digest, etag, timeout, previous=None):
+    started = time.monotonic()
+    response = render()
+    if response.status_code != 200:
+        return response
+    # Страницу, собранную по отставшей реплике, отдаём как есть:
+    # под текущим ETag и ключом она бы закрепилась
+    if getattr(response, 'stale_replica', False):
+        if response.has_header('Last-Modified'):
+            del response['Last-Modified']
+        return response
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(_last_modified(previous, digest))
+    if not response.cookies:
+        # Запись живёт дольше своего срока, чтобы её можно было отдать
+        # устаревшей, пока другой процесс собирает новую
+        cache.set(
+            key,
+            (digest, response, time.time() + timeout,
+             time.monotonic() - started),
+            timeout + settings.PAGE_STALE_TIME,
+        )
+    return response
+
+
+def _cached_page(render, request, digest, etag, timeout):
+    """Страница из кэша с защитой от одновременной пересборки.
+
+    Пересобирает страницу только процесс, захвативший блокировку;
+    остальные отдают прежнюю копию. Браузер, который только что сам
+    что-то записал, прежнюю копию другого поколения не получает и
+    ждёт новую.
+    """
+    page = page_id(request)
+    key = PAGE_KEY.format(page)
+    entry = cache.get(key)
+    if entry is not None and _fresh(entry, digest):
+        return entry[1]
+    lock = PAGE_LOCK_KEY.format(page)
+    if cache.add(lock, True, settings.PAGE_LOCK_TIME):
+        try:
+            return _render(render, key, digest, etag, timeout, entry)
+        finally:
+            cache.delete(lock)
+    if entry is not None and (
+        entry[0] == digest or replica.STICKY_COOKIE not in request.COOKIES
+    ):
+        return entry[1]
+    response = _wait_for_page(key, lock, digest)
+    if response is None:
+        # Сборщик не успел или упал: собираем сами
+        response = _render(render, key, digest, etag, timeout, entry)
+    return response
+
+
+def cache_page_versioned(timeout, scopes):
+    """Кэширует страницу под ключом, включающим поколения областей.
+
+    ``scopes`` получает аргументы представления и возвращает список
+    областей; при изменении данных сигналы повышают поколение области,
+    и страница пересобирается при следующем запросе. Пока она
+    пересобирается, остальные запросы получают прежнюю копию.
+
+    Тот же ключ служит слабым ETag: повторный запрос с If-None-Match
+    получает 304 без обращения к базе и к кэшу страниц.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            view_scopes = tuple(scopes(*args, **kwargs))
+            digest = page_digest(request, view_scopes)
+            etag = f'W/"{digest}"'
+            response = get_conditional_response(request, etag=etag)
+            if response is not None:
+                response['ETag'] = etag
+                return _revalidate(request, response)
+            token = replica.page_scopes.set((GLOBAL_SCOPE,) + view_scopes)
+            try:
+                response = _cached_page(
+                    partial(view, request, *args, **kwargs), request,
+                    digest, etag, timeout
+                )
+            finally:
+                replica.page_scopes.reset(token)
+            if response.status_code != 200:
+                return response
+            # Клиенты без ETag (например, RSS-читалки) присылают
+            # If-Modified-Since, сверяем его с временем сборки страницы.
+            # У прежней копии свой ETag, текущий ей не подходит
+            last_modified = parse_http_date_safe(
+                response.get('Last-Modified', '')
+            )
+            if last_modified is not None:
+                response = get_conditional_response(
+                    request, etag=response.get('ETag'),
+                    last_modified=last_modified, response=response
+                )
+            return _revalidate(request, response)
+        return wrapper
+    return decorator
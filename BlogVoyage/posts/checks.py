@@ -0,0 +1,31 @@
+from django.core.checks import Tags, Warning, register
+from django.db import connections
+
+from . import search
+
+
+@register(Tags.database)
+def check_search_index(app_configs, **kwargs):
+    """Находит потерянные триггеры поискового индекса.
+
+    Запускается командой migrate и ``check --tag database``.
+    """
+    databases = kwargs.get('databases') or ['default']
+    errors = []
+    for alias in databases:
+        connection = connections[alias]
+        if connection.vendor != 'sqlite':
+            continue
+        table = 'posts_post'
+        if table not in connection.introspection.table_names():
+            continue
+        with connection.cursor() as cursor:
+            missing = search.missing_objects(cursor)
+        if missing:
+            errors.append(Warning(
+                'Поисковый индекс постов неполон: нет '
+                f'{", ".join(missing)} в базе {alias}',
+                hint='Выполните python manage.py rebuild_search_index',
+                id='posts.W001',
+            ))
+    return errors
@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Post, UserCounters
+
+User = get_user_model()
+
+USER_COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+
+
+def change_user_counters(user_id, **deltas):
+    changes = {
+        field: Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items()
+    }
+    updated = UserCounters.objects.filter(user_id=user_id).update(**changes)
+    # При удалении строку не создаём: пользователь может удаляться каскадно
+    if not updated and all(delta > 0 for delta in deltas.values()):
+        UserCounters.objects.get_or_create(user_id=user_id)
+        UserCounters.objects.filter(user_id=user_id).update(**changes)
+
+
+def change_comments_count(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=Greatest(F('comments_count') + delta, 0)
+    )
+
+
+def _count_of(model, field, outer_field):
+    counted = model.objects.filter(
+        **{field: OuterRef(outer_field)}
+    ).order_by().values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(
+        Subquery(counted, output_field=IntegerField()), 0
+    )
+
+
+def reconcile():
+    """Пересчитывает счётчики по фактическим данным.
+
+    Возвращает число исправленных строк счётчиков пользователей
+    и постов.
+    """
+    UserCounters.objects.bulk_create(
+        [
+            UserCounters(user_id=user_id)
+            for user_id in User.objects.filter(
+                counters__isnull=True
+            ).values_list('pk', flat=True)
+        ],
+        ignore_conflicts=True,
+    )
+    actual = {
+        f'actual_{field}': _count_of(model, related, 'user_id')
+        for field, (model, related) in USER_COUNTERS.items()
+    }
+    drift = Q()
+    for field in USER_COUNTERS:
+        drift |= ~Q(**{field: F(f'actual_{field}')})
+    users = UserCounters.objects.annotate(**actual).filter(drift).update(**{
+        field: _count_of(model, related, 'user_id')
+        for field, (model, related) in USER_COUNTERS.items()
+    })
+    posts = Post.objects.annotate(
+        actual_comments=_count_of(Comment, 'post', 'pk')
+    ).exclude(comments_count=F('actual_comments')).update(
+        comments_count=_count_of(Comment, 'post', 'pk')
+    )
+    return users, posts
@@ -0,0 +1,178 @@
+import logging
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+
+from . import follow_graph, timeline
+from .caching import GLOBAL_SCOPE, bump
+from .models import Comment, Follow, Post, Timeline, UserCounters
+from .thumbnails import queue_image_cleanup
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+
+def _decrement(queryset, field, counts):
+    # Строки с одинаковым уменьшением обновляются одним запросом
+    by_delta = defaultdict(list)
+    for pk, delta in counts.items():
+        by_delta[delta].append(pk)
+    for delta, pks in by_delta.items():
+        queryset.filter(pk__in=pks).update(
+            **{field: Greatest(F(field) - delta, 0)}
+        )
+
+
+class BatchDeleter:
+    """Удаляет пользователей и посты частями по ``batch_size`` строк.
+
+    Каскад Django сначала загружает в память все связанные объекты и
+    удаляет их в одной транзакции. Здесь зависимые строки удаляются
+    пачками, каждая в своей транзакции, так что память ограничена
+    размером пачки, а база не блокируется надолго. Сигналы при этом
+    не срабатывают, поэтому счётчики, кэш подписок и файлы картинок
+    обновляются здесь же, а кэш страниц сбрасывается в finish().
+
+    ``progress`` вызывается после каждой пачки с названием шага и
+    числом строк, удалённых на этом шаге к текущему моменту.
+    """
+
+    def __init__(self, batch_size=None, progress=None):
+        self.batch_size = batch_size or settings.DELETION_BATCH_SIZE
+        self.progress = progress
+        self.deleted = Counter()
+
+    def _drain(self, label, queryset, fields=(), before_delete=None):
+        """Удаляет строки queryset пачками, пока они не закончатся.
+
+        ``before_delete`` получает значения ``fields`` строк пачки
+        и вызывается в той же транзакции до удаления.
+        """
+        model = queryset.model
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    queryset.order_by('pk').values_list('pk', *fields)[
+                        :self.batch_size
+                    ]
+                )
+                if not rows:
+                    return
+                if before_delete is not None:
+                    before_delete([row[1:] for row in rows])
+                batch = model.objects.filter(pk__in=[row[0] for row in rows])
+                # Обходим сборщик каскада: зависимые строки уже удалены
+                batch._raw_delete(batch.db)
+            self.deleted[label] += len(rows)
+            if self.progress is not None:
+                self.progress(label, self.deleted[label])
+            logger.info('%s: удалено %s', label, self.deleted[label])
+
+    def _forget_posts(self, rows):
+        authors = Counter(author_id for author_id, _ in rows)
+        _decrement(UserCounters.objects, 'posts_count', authors)
+        queue_image_cleanup([image for _, image in rows])
+
+    def _forget_comments(self, rows):
+        _decrement(
+            Post.objects, 'comments_count',
+            Counter(post_id for post_id, in rows)
+        )
+
+    def _forget_follows(self, rows):
+        _decrement(
+            UserCounters.objects, 'following_count',
+            Counter(user_id for user_id, _ in rows)
+        )
+        authors = Counter(author_id for _, author_id in rows)
+        limit = settings.TIMELINE_FANOUT_LIMIT
+        hot = UserCounters.objects.filter(
+            user_id__in=authors, followers_count__gt=limit
+        ).values_list('user_id', 'followers_count')
+        cooled = [
+            author_id for author_id, count in hot
+            if count - authors[author_id] <= limit
+        ]
+        _decrement(UserCounters.objects, 'followers_count', authors)
+        timeline.cool_down(cooled)
+        follow_graph.invalidate(*{user_id for user_id, _ in rows})
+
+    def delete_posts(self, posts):
+        """Удаляет посты из queryset вместе с комментариями и записями
+        лент подписок."""
+        post_ids = posts.values('pk')
+        self._drain('Записи лент', Timeline.objects.filter(post__in=post_ids))
+        self._drain('Комментарии', Comment.objects.filter(post__in=post_ids))
+        self._drain(
+            'Посты', posts, ('author_id', 'image'), self._forget_posts
+        )
+
+    def delete_user(self, user):
+        self.delete_posts(Post.objects.filter(author=user))
+        self._drain(
+            'Комментарии', Comment.objects.filter(author=user), ('post_id',),
+            self._forget_comments
+        )
+        self._drain('Записи лент', Timeline.objects.filter(user=user))
+        for follows in (
+            Follow.objects.filter(user=user),
+            Follow.objects.filter(author=user),
+        ):
+            self._drain(
+                'Подписки', follows, ('user_id', 'author_id'),
+                self._forget_follows
+            )
+        # Оставшиеся связи (счётчики, журнал админки) невелики
+        user.delete()
+        self.deleted['Пользователи'] += 1
+
+    def delete_users(self, users):
+        for user in list(users):
+            self.delete_user(user)
+
+    def finish(self):
+        """Сбрасывает кэш «горячих» авторов и всех страниц и карточек."""
+        cache.delete(timeline.HOT_AUTHORS_KEY)
+        bump(GLOBAL_SCOPE)
+        return dict(self.deleted)
+
+
+def summarize(posts=None, users=None):
+    """Сколько строк каждой модели затронет удаление, без загрузки строк.
+
+    Используется админкой вместо полного списка удаляемых объектов.
+    """
+    if users is not None:
+        posts = Post.objects.filter(author__in=users)
+        comments = Comment.objects.filter(
+            Q(author__in=users) | Q(post__author__in=users)
+        )
+        follows = Follow.objects.filter(
+            Q(user__in=users) | Q(author__in=users)
+        )
+    else:
+        comments = Comment.objects.filter(post__in=posts)
+        follows = Follow.objects.none()
+    return {
+        model: queryset.count()
+        for model, queryset in (
+            (Post, posts), (Comment, comments), (Follow, follows)
+        )
+    }
+
+
+def delete_posts(posts, **options):
+    deleter = BatchDeleter(**options)
+    deleter.delete_posts(posts)
+    return deleter.finish()
+
+
+def delete_users(users, **options):
+    deleter = BatchDeleter(**options)
+    deleter.delete_users(users)
+    return deleter.finish()
@@ -0,0 +1,97 @@
+import csv
+import json
+
+from django.core.files.storage import default_storage
+
+from .models import Comment, Post
+
+# Те же поля, что понимает import_content, плюс адрес картинки
+CSV_FIELDS = (
+    'type', 'id', 'post', 'author', 'text', 'pub_date', 'created', 'group',
+    'image', 'image_url',
+)
+CHUNK_SIZE = 2000
+BUFFER_SIZE = 64 * 1024
+
+
+def export_records(author, url=None):
+    """Посты автора и комментарии к ним в формате записей импорта.
+
+    Посты и комментарии читаются двумя курсорами, упорядоченными по id
+    поста, и сливаются на лету, поэтому в памяти одновременно находится
+    не больше одной пачки каждого вида.
+    """
+    posts = Post.objects.filter(author=author).order_by('pk').values_list(
+        'pk', 'text', 'pub_date', 'group__slug', 'image'
+    )
+    comments = Comment.objects.filter(post__author=author).order_by(
+        'post_id', 'pk'
+    ).values_list('post_id', 'author__username', 'text', 'created')
+    comments = comments.iterator(chunk_size=CHUNK_SIZE)
+    comment = next(comments, None)
+    for pk, text, pub_date, group, image in posts.iterator(
+        chunk_size=CHUNK_SIZE
+    ):
+        image_url = default_storage.url(image) if image else ''
+        yield {
+            'type': 'post',
+            'id': pk,
+            'author': author.username,
+            'text': text,
+            'pub_date': pub_date.isoformat(),
+            'group': group or '',
+            'image': image,
+            'image_url': url(image_url) if url and image_url else image_url,
+        }
+        while comment is not None and comment[0] == pk:
+            yield {
+                'type': 'comment',
+                'post': pk,
+                'author': comment[1],
+                'text': comment[2],
+                'created': comment[3].isoformat(),
+            }
+            comment = next(comments, None)
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def jsonl_lines(records):
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def csv_lines(records):
+    writer = csv.DictWriter(_Echo(), CSV_FIELDS)
+    yield writer.writeheader()
+    for record in records:
+        yield writer.writerow(record)
+
+
+def buffered(lines, size=BUFFER_SIZE):
+    # Отдаём строки крупными кусками, а не по одной на запись
+    chunk = []
+    length = 0
+    for line in lines:
+        chunk.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(chunk)
+            chunk = []
+            length = 0
+    if chunk:
+        yield ''.join(chunk)
+
+
+FORMATS = {
+    'jsonl': (jsonl_lines, 'application/x-ndjson; charset=utf-8'),
+    'csv': (csv_lines, 'text/csv; charset=utf-8'),
+}
+
+
+def export_lines(author, export_format, url=None):
+    lines, _ = FORMATS[export_format]
+    return buffered(lines(export_records(author, url)))
@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse, reverse_lazy
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+
+from .models import Group, Post
+
+User = get_user_model()
+
+
+class LatestPostsFeed(Feed):
+    title = 'BlogVoyage: последние записи'
+    link = reverse_lazy('posts:index')
+    description = 'Новые записи всех авторов'
+
+    def items(self):
+        return Post.objects.select_related('author', 'group')[
+            :settings.FEED_ITEMS
+        ]
+
+    def item_title(self, item):
+        return Truncator(item.text).words(8)
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', args=[item.pk])
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_categories(self, item):
+        return [item.group.title] if item.group else []
+
+
+class GroupFeed(LatestPostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, group):
+        return f'BlogVoyage: {group.title}'
+
+    def link(self, group):
+        return reverse('posts:group_list', args=[group.slug])
+
+    def description(self, group):
+        return group.description
+
+    def items(self, group):
+        return group.posts.select_related('author', 'group')[
+            :settings.FEED_ITEMS
+        ]
+
+
+class AuthorFeed(LatestPostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, author):
+        return f'BlogVoyage: {author.get_full_name() or author.username}'
+
+    def link(self, author):
+        return reverse('posts:profile', args=[author.username])
+
+    def description(self, author):
+        return f'Записи пользователя {author.username}'
+
+    def items(self, author):
+        return author.posts.select_related('author', 'group')[
+            :settings.FEED_ITEMS
+        ]
+
+
+def atom(feed_class):
+    """Та же лента в формате Atom."""
+    return type(f'{feed_class.__name__}Atom', (feed_class,), {
+        'feed_type': Atom1Feed,
+        'subtitle': feed_class.description,
+    })
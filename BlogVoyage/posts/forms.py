@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth import get_user_model
 
+from .images import IngestedImageField
 from .models import Comment, Post
 
 User = get_user_model()
@@ -10,6 +11,7 @@ class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         fields = ('group', 'text', 'image')
+        field_classes = {'image': IngestedImageField}
 
 
 class CommentForm(forms.ModelForm):
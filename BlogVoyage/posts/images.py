@@ -0,0 +1,94 @@
+import os
+from tempfile import SpooledTemporaryFile
+
+from django import forms
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+# Форматы, которые пересохраняем как есть; остальные (BMP, TIFF, ICO…)
+# пересохраняются в PNG, чтобы тоже пройти уменьшение и очистку
+WRITABLE_FORMATS = {
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+    'GIF': 'image/gif',
+    'WEBP': 'image/webp',
+}
+
+
+def _spooled():
+    return SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+
+
+def ingest(uploaded):
+    """Проверяет и нормализует загруженную картинку.
+
+    Размер в пикселях проверяется по заголовку до декодирования.
+    Оригинал уменьшается до IMAGE_MAX_SIDE и пересохраняется без
+    метаданных во временный файл, который уходит на диск при превышении
+    FILE_UPLOAD_MAX_MEMORY_SIZE. От анимированных GIF и WebP остаётся
+    первый кадр.
+    """
+    if uploaded.size > settings.IMAGE_UPLOAD_MAX_SIZE:
+        raise ValidationError(
+            'Файл слишком большой: не более %(limit)s.',
+            code='file_too_large',
+            params={'limit': filesizeformat(settings.IMAGE_UPLOAD_MAX_SIZE)},
+        )
+    uploaded.seek(0)
+    image = Image.open(uploaded)
+    width, height = image.size
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Картинка слишком большая: %(width)s×%(height)s пикселей.',
+            code='too_many_pixels',
+            params={'width': width, 'height': height},
+        )
+    image_format = image.format
+    name = uploaded.name
+    if image_format not in WRITABLE_FORMATS:
+        image_format = 'PNG'
+        name = f'{os.path.splitext(name)[0]}.png'
+    max_side = settings.IMAGE_MAX_SIDE
+    # JPEG умеет декодироваться сразу в уменьшенном масштабе
+    image.draft(image.mode, (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side))
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    elif image.mode not in ('1', 'L', 'LA', 'P', 'RGB', 'RGBA'):
+        # CMYK, 16-битные и прочие режимы пишут не все форматы
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    output = _spooled()
+    options = {'optimize': True}
+    if image_format in ('JPEG', 'WEBP'):
+        options['quality'] = settings.IMAGE_QUALITY
+    image.save(output, image_format, **options)
+    size = output.tell()
+    output.seek(0)
+    return UploadedFile(
+        file=output,
+        name=name,
+        content_type=WRITABLE_FORMATS[image_format],
+        size=size,
+    )
+
+
+class IngestedImageField(forms.ImageField):
+    def to_python(self, data):
+        uploaded = forms.FileField.to_python(self, data)
+        if uploaded is None:
+            return None
+        try:
+            return ingest(uploaded)
+        except ValidationError:
+            raise
+        except Exception as error:
+            raise ValidationError(
+                self.error_messages['invalid_image'],
+                code='invalid_image',
+            ) from error
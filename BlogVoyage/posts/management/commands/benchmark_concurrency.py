@@ -0,0 +1,113 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import override_settings
+
+from ... import benchmark
+
+BENCHMARKS_DIR = os.path.join(settings.BASE_DIR, 'benchmarks')
+
+# Значения SQLite по умолчанию и новое соединение на каждый запрос
+MODES = {
+    'stock': {
+        'pragmas': {
+            'journal_mode': 'DELETE',
+            'synchronous': 'FULL',
+            'mmap_size': 0,
+            'cache_size': -2000,
+        },
+        'conn_max_age': 0,
+    },
+    'tuned': {
+        'pragmas': settings.SQLITE_PRAGMAS,
+        'conn_max_age': settings.DATABASES['default'].get('CONN_MAX_AGE', 0),
+    },
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность смешанного чтения и записи '
+        'с настройками SQLite по умолчанию и с настройками проекта'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument(
+            '--duration', type=float, default=10,
+            help='Длительность прогона каждого режима, секунды'
+        )
+        parser.add_argument(
+            '--modes', nargs='+', choices=MODES, default=list(MODES)
+        )
+        parser.add_argument(
+            '--data-dir', default=os.path.join(BENCHMARKS_DIR, 'data')
+        )
+        parser.add_argument(
+            '--output',
+            default=os.path.join(BENCHMARKS_DIR, 'concurrency.json')
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Замеры рассчитаны на базу SQLite')
+        os.makedirs(options['data_dir'], exist_ok=True)
+        path = os.path.join(
+            options['data_dir'], f'posts-{options["posts"]}.sqlite3'
+        )
+        if not os.path.exists(path):
+            self.stdout.write(
+                f'Генерация базы на {options["posts"]} постов...'
+            )
+            benchmark.seed(options['posts'], path)
+        results = []
+        with tempfile.TemporaryDirectory() as workdir:
+            for mode in options['modes']:
+                # Каждый режим начинает с одинаковой копии базы
+                work_path = os.path.join(workdir, f'{mode}.sqlite3')
+                shutil.copyfile(path, work_path)
+                result = self.run_mode(mode, work_path, options)
+                results.append(result)
+                self.report(result)
+        benchmark.dump(
+            {'environment': benchmark.environment(), 'results': results},
+            options['output']
+        )
+        self.stdout.write(f'Результаты записаны в {options["output"]}')
+
+    def run_mode(self, mode, path, options):
+        config = MODES[mode]
+        database = connections.databases['default']
+        conn_max_age = database.get('CONN_MAX_AGE', 0)
+        database['CONN_MAX_AGE'] = config['conn_max_age']
+        try:
+            with override_settings(
+                SQLITE_PRAGMAS=config['pragmas'], DEBUG=False,
+                ALLOWED_HOSTS=['testserver'], CACHES=benchmark.NO_CACHE,
+            ), benchmark.database(path):
+                load = benchmark.mixed_load(
+                    options['duration'], options['readers'],
+                    options['writers']
+                )
+        finally:
+            database['CONN_MAX_AGE'] = conn_max_age
+        return dict(
+            load, mode=mode, posts=options['posts'],
+            readers=options['readers'], writers=options['writers'],
+        )
+
+    def report(self, result):
+        for kind in ('read', 'write'):
+            stats = result[kind]
+            self.stdout.write(
+                f'{result["mode"]:<6} {kind:<5} '
+                f'{stats["ops_per_sec"]:>8.1f} оп/с  '
+                f'p50 {stats["p50_ms"]} мс  p99 {stats["p99_ms"]} мс  '
+                f'ошибок {stats["errors"]}'
+            )
@@ -0,0 +1,110 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from ... import benchmark
+
+BENCHMARKS_DIR = os.path.join(settings.BASE_DIR, 'benchmarks')
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержку и число SQL-запросов страниц ленты на '
+        'сгенерированных базах разного размера'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts', type=int, nargs='+', default=[10000],
+            help='Размеры баз в постах, например 10000 100000 1000000'
+        )
+        parser.add_argument(
+            '--depths', type=int, nargs='+', default=[1, 10, 100],
+            help='Номера страниц, на которых идут замеры'
+        )
+        parser.add_argument('--iterations', type=int, default=100)
+        parser.add_argument(
+            '--views', nargs='+', choices=benchmark.VIEWS,
+            default=benchmark.VIEWS
+        )
+        parser.add_argument(
+            '--warm', action='store_true',
+            help='Не отключать кэш страниц (по умолчанию меряем промахи)'
+        )
+        parser.add_argument(
+            '--data-dir', default=os.path.join(BENCHMARKS_DIR, 'data'),
+            help='Где хранить сгенерированные базы между запусками'
+        )
+        parser.add_argument(
+            '--reseed', action='store_true',
+            help='Пересоздать базы, даже если они уже есть'
+        )
+        parser.add_argument(
+            '--output', default=os.path.join(BENCHMARKS_DIR, 'results.json')
+        )
+        parser.add_argument(
+            '--baseline',
+            default=os.path.join(BENCHMARKS_DIR, 'baseline.json'),
+            help='Результаты, с которыми сравнивается прогон'
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.5,
+            help='Допустимый рост задержки, доля от базовой'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Замеры рассчитаны на базу SQLite')
+        os.makedirs(options['data_dir'], exist_ok=True)
+        results = []
+        for size in options['posts']:
+            path = os.path.join(options['data_dir'], f'posts-{size}.sqlite3')
+            if options['reseed'] and os.path.exists(path):
+                os.remove(path)
+            results.extend(self.run_size(size, path, options))
+        report = {'environment': benchmark.environment(), 'results': results}
+        benchmark.dump(report, options['output'])
+        self.stdout.write(f'Результаты записаны в {options["output"]}')
+        self.check_baseline(results, options)
+
+    def seed(self, size, path):
+        self.stdout.write(f'Генерация базы на {size} постов...')
+        benchmark.seed(size, path)
+
+    def run_size(self, size, path, options):
+        if not os.path.exists(path):
+            self.seed(size, path)
+        caches = {} if options['warm'] else {'CACHES': benchmark.NO_CACHE}
+        with benchmark.database(path), override_settings(
+            DEBUG=False, ALLOWED_HOSTS=['testserver'], **caches
+        ):
+            results = benchmark.run(
+                size, options['depths'], options['iterations'],
+                options['views']
+            )
+        for result in results:
+            self.stdout.write(
+                '{posts:>8} {view:<13} стр. {depth:<4} p50 {p50_ms:>8.2f} мс'
+                '  p99 {p99_ms:>8.2f} мс  запросов {queries}'.format(**result)
+            )
+        return results
+
+    def check_baseline(self, results, options):
+        if not os.path.exists(options['baseline']):
+            self.stdout.write('Базовых результатов нет, сравнение пропущено')
+            return
+        regressions = benchmark.compare(
+            results, benchmark.load(options['baseline']),
+            options['tolerance']
+        )
+        for result, metric, old, new in regressions:
+            self.stderr.write(
+                f'{result["posts"]} {result["view"]} стр. {result["depth"]}: '
+                f'{metric} {old} -> {new}'
+            )
+        if regressions:
+            raise CommandError(f'Регрессий: {len(regressions)}')
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from ...exporting import FORMATS, export_lines
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Потоково выгружает посты пользователя вместе с комментариями'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument(
+            '--format', dest='export_format', choices=tuple(FORMATS),
+            default='jsonl'
+        )
+        parser.add_argument(
+            '--output', help='Файл для выгрузки (по умолчанию stdout)'
+        )
+        parser.add_argument(
+            '--base-url', default='',
+            help='Префикс адресов картинок, например https://example.com'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            author = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError('Пользователь не найден')
+        base_url = options['base_url'].rstrip('/')
+        lines = export_lines(
+            author, options['export_format'],
+            (lambda path: base_url + path) if base_url else None
+        )
+        if options['output']:
+            with open(
+                options['output'], 'w', encoding='utf-8', newline=''
+            ) as file:
+                file.writelines(lines)
+        else:
+            for chunk in lines:
+                self.stdout.write(chunk, ending='')
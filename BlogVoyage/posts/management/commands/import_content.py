@@ -0,0 +1,94 @@
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from ...importing import Importer, InvalidRecord, read_records
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково импортирует группы, пользователей, посты, комментарии '
+        'и подписки из JSON Lines или CSV'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл .jsonl или .csv')
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'), default=None,
+            help='Формат файла (по умолчанию по расширению)'
+        )
+        parser.add_argument(
+            '--type', dest='record_type',
+            choices=('group', 'user', 'post', 'comment', 'follow'),
+            help='Тип записей CSV-файла без колонки type'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help='Записей в одной транзакции'
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить с последней сохранённой пачки'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl'
+        )
+        checkpoint = f'{path}.progress'
+        done = 0
+        if os.path.exists(checkpoint):
+            if not options['resume']:
+                raise CommandError(
+                    f'Импорт этого файла был прерван. Запустите команду '
+                    f'с --resume или удалите {checkpoint}'
+                )
+            with open(checkpoint, encoding='utf-8') as file:
+                done = json.load(file)['records']
+            self.stdout.write(f'Продолжаем с записи {done + 1}')
+        importer = Importer()
+        started = time.monotonic()
+        imported = 0
+        with open(path, encoding='utf-8', newline='') as file:
+            records = read_records(
+                file, file_format, options['record_type'], skip=done
+            )
+            while True:
+                try:
+                    chunk = list(islice(records, options['chunk_size']))
+                    if not chunk:
+                        break
+                    importer.import_chunk(chunk)
+                except (InvalidRecord, IntegrityError) as error:
+                    raise CommandError(
+                        f'Пачка с записи {done + 1}: {error}. Исправьте файл '
+                        f'и запустите команду с --resume'
+                    ) from error
+                done += len(chunk)
+                imported += len(chunk)
+                self.save_checkpoint(checkpoint, done)
+                rate = imported / max(time.monotonic() - started, 1e-6)
+                self.stdout.write(
+                    f'Обработано записей: {done} ({rate:.0f} в секунду)'
+                )
+        importer.finish()
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        summary = ', '.join(
+            f'{record_type}: {count}'
+            for record_type, count in importer.counts.items()
+        )
+        self.stdout.write(self.style.SUCCESS(f'Импорт завершён ({summary})'))
+
+    @staticmethod
+    def save_checkpoint(path, records):
+        # Запись через временный файл: обрыв не оставит битую отметку
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump({'records': records}, file)
+        os.replace(temporary, path)
@@ -0,0 +1,49 @@
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ...models import Post
+from ...thumbnails import get_executor, render_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Строит миниатюры для всех уже загруженных картинок постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Число процессов (по умолчанию THUMBNAIL_WORKERS)'
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers'] or settings.THUMBNAIL_WORKERS or 1
+        executor = get_executor(workers)
+        names = Post.objects.exclude(image='').order_by().values_list(
+            'image', flat=True
+        ).distinct()
+        pending = set()
+        self.done = self.failed = 0
+        for name in names.iterator():
+            # Ограничиваем очередь, чтобы не держать в памяти все задачи
+            if len(pending) >= workers * 4:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                self.collect(finished)
+            pending.add(executor.submit(render_thumbnails, name))
+        self.collect(wait(pending).done)
+        executor.shutdown()
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {self.done}, с ошибками: {self.failed}'
+        ))
+
+    def collect(self, futures):
+        for future in futures:
+            if future.exception() is None:
+                self.done += 1
+            else:
+                self.failed += 1
+                self.stderr.write(str(future.exception()))
+            if (self.done + self.failed) % 100 == 0:
+                self.stdout.write(f'Обработано {self.done + self.failed}')
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from ... import search
+
+
+class Command(BaseCommand):
+    help = 'Восстанавливает полнотекстовый индекс постов и его триггеры'
+
+    def handle(self, *args, **options):
+        if not search.available():
+            raise CommandError('Полнотекстовый поиск доступен только в SQLite')
+        with connection.cursor() as cursor:
+            search.install(cursor)
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен'))
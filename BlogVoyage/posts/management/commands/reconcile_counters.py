@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from ...counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики постов и подписок'
+
+    def handle(self, *args, **options):
+        users, posts = reconcile()
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счётчиков: пользователей {users}, постов {posts}'
+        ))
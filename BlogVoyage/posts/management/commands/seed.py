@@ -0,0 +1,100 @@
+import time
+from collections import Counter
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import timeline
+from ...caching import GLOBAL_SCOPE, bump
+from ...models import UserCounters
+from ...seeding import Seeder, fill_timelines
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу правдоподобными пользователями, сообществами, '
+        'постами, комментариями и подписками для нагрузочных стендов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument(
+            '--users', type=int,
+            help='По умолчанию один пользователь на 20 постов'
+        )
+        parser.add_argument(
+            '--groups', type=int,
+            help='По умолчанию одно сообщество на 2000 постов'
+        )
+        parser.add_argument(
+            '--follows', type=float, default=20,
+            help='Среднее число подписок пользователя'
+        )
+        parser.add_argument(
+            '--comments', type=float, default=1.0,
+            help='Среднее число комментариев к посту'
+        )
+        parser.add_argument(
+            '--images', type=int, default=0,
+            help='Сколько картинок-заглушек сгенерировать для постов'
+        )
+        parser.add_argument(
+            '--image-share', type=float, default=0.3,
+            help='Доля постов с картинкой'
+        )
+        parser.add_argument(
+            '--timelines', type=int, default=100,
+            help='Для скольких самых активных читателей построить ленты'
+        )
+        parser.add_argument('--batch-size', type=int, default=20000)
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Зерно генератора: одинаковое зерно — одинаковые данные'
+        )
+        parser.add_argument('--locale', default='ru_RU')
+
+    def report(self, label, count):
+        self.inserted[label] = count
+        if self.verbosity > 1:
+            self.stdout.write(f'{label}: {count}')
+
+    def handle(self, *args, **options):
+        if options['posts'] < 1:
+            raise CommandError('Нужен хотя бы один пост')
+        self.verbosity = options['verbosity']
+        self.inserted = Counter()
+        started = time.monotonic()
+        seeder = Seeder(
+            options['posts'],
+            users=options['users'],
+            groups=options['groups'],
+            follows=options['follows'],
+            comments=options['comments'],
+            images=options['images'],
+            image_share=options['image_share'],
+            batch_size=options['batch_size'],
+            seed=options['seed'],
+            locale=options['locale'],
+            progress=self.report,
+        ).run()
+        # Новые пользователи идут подряд за прежними: граница вместо
+        # списка id не упирается в лимит параметров запроса
+        readers = UserCounters.objects.filter(
+            user_id__gte=seeder.user_ids[0]
+        ).order_by('-following_count', 'user_id').values_list(
+            'user_id', flat=True
+        )
+        fill_timelines(
+            list(readers[:options['timelines']]), progress=self.report
+        )
+        # Строки вставлены без сигналов: сбрасываем кэши вручную
+        cache.delete(timeline.HOT_AUTHORS_KEY)
+        bump(GLOBAL_SCOPE)
+        elapsed = time.monotonic() - started
+        for label, count in self.inserted.items():
+            self.stdout.write(f'{label}: {count}')
+        total = sum(self.inserted.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Вставлено строк: {total} за {elapsed:.1f} с '
+            f'({total / elapsed:.0f} строк/с)'
+        ))
@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ...warming import warm
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет кэш страниц и миниатюр после перезапуска: главная, '
+        'сообщества и профили самых активных авторов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', type=int, default=settings.WARM_CACHE_PAGES,
+            help='Сколько первых страниц главной отрисовать'
+        )
+        parser.add_argument(
+            '--profiles', type=int, default=settings.WARM_CACHE_PROFILES,
+            help='Для скольких самых активных авторов отрисовать профиль'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=settings.WARM_CACHE_WORKERS,
+            help='Сколько запросов выполнять одновременно'
+        )
+
+    def report(self, label, count):
+        if self.verbosity > 1:
+            self.stdout.write(f'{label}: {count}')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        started = time.monotonic()
+        done = warm(
+            pages=options['pages'],
+            profiles=options['profiles'],
+            workers=options['workers'],
+            progress=self.report,
+        )
+        for label, count in done.items():
+            self.stdout.write(f'{label}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Кэш прогрет за {time.monotonic() - started:.1f} с'
+        ))
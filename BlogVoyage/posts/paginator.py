@@ -0,0 +1,186 @@
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+from datetime import datetime
+
+from django.db.models import DateTimeField, FloatField, Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(values):
+    raw = json.dumps([
+        value.isoformat() if isinstance(value, datetime) else value
+        for value in values
+    ], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode_value(value, kind):
+    if kind is datetime:
+        if not isinstance(value, str):
+            return None
+        # Корректная по форме, но невозможная дата (13-й месяц)
+        # вызывает ValueError, а не возвращает None
+        try:
+            return parse_datetime(value)
+        except ValueError:
+            return None
+    if isinstance(value, bool) or not isinstance(
+        value, (int, float) if kind is float else int
+    ):
+        return None
+    return value
+
+
+def decode_cursor(token, types):
+    """Значения курсора; ``types`` — ожидаемый тип каждого значения
+    (datetime, int или float)."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise InvalidCursor(token)
+    if not isinstance(values, list) or len(values) != len(types):
+        raise InvalidCursor(token)
+    decoded = [
+        _decode_value(value, kind) for value, kind in zip(values, types)
+    ]
+    if None in decoded:
+        raise InvalidCursor(token)
+    return decoded
+
+
+def field_types(model, fields):
+    """Типы значений курсора для полей ключа модели."""
+    types = []
+    for name in fields:
+        field = (
+            model._meta.pk if name == 'pk' else model._meta.get_field(name)
+        )
+        if isinstance(field, DateTimeField):
+            types.append(datetime)
+        elif isinstance(field, FloatField):
+            types.append(float)
+        else:
+            types.append(int)
+    return tuple(types)
+
+
+class CursorPage(Sequence):
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._next_cursor = (
+            paginator.cursor_for(object_list[-1])
+            if has_next and object_list else None
+        )
+        self._previous_cursor = (
+            paginator.cursor_for(object_list[0])
+            if has_previous and object_list else None
+        )
+
+    def __repr__(self):
+        return '<CursorPage of %d objects>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._next_cursor is not None
+
+    def has_previous(self):
+        return self._previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def next_cursor(self):
+        return self._next_cursor
+
+    def previous_cursor(self):
+        return self._previous_cursor
+
+
+class CursorPaginator:
+    """Постраничный вывод по ключу (keyset) без COUNT и OFFSET.
+
+    Порядок задаётся кортежем полей, последнее из которых должно быть
+    уникальным (обычно pk); все поля сортируются в одном направлении.
+    """
+
+    def __init__(self, object_list, per_page, fields=('pub_date', 'pk'),
+                 descending=True):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.fields = tuple(fields)
+        self.types = field_types(object_list.model, self.fields)
+        self.descending = descending
+
+    def cursor_for(self, obj):
+        return encode_cursor(getattr(obj, field) for field in self.fields)
+
+    def _keyset(self, values, lookup):
+        condition = Q()
+        for index, field in enumerate(self.fields):
+            step = Q(**{f'{field}__{lookup}': values[index]})
+            for prev_field, prev_value in zip(self.fields, values[:index]):
+                step &= Q(**{prev_field: prev_value})
+            condition |= step
+        return condition
+
+    def _ordered(self, descending):
+        prefix = '-' if descending else ''
+        return self.object_list.order_by(
+            *(prefix + field for field in self.fields)
+        )
+
+    def page(self, after=None, before=None):
+        forward, backward = ('lt', 'gt') if self.descending else ('gt', 'lt')
+        if before is not None:
+            values = decode_cursor(before, self.types)
+            rows = list(
+                self._ordered(descending=not self.descending)
+                .filter(self._keyset(values, backward))[:self.per_page + 1]
+            )
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            rows.reverse()
+            return CursorPage(rows, self, True, has_previous)
+        queryset = self._ordered(descending=self.descending)
+        if after is not None:
+            values = decode_cursor(after, self.types)
+            queryset = queryset.filter(self._keyset(values, forward))
+        rows = list(queryset[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        return CursorPage(
+            rows[:self.per_page], self, has_next, after is not None
+        )
+
+    def page_by_number(self, number):
+        # Совместимость со старыми ссылками вида ?page=N: OFFSET без COUNT
+        offset = (number - 1) * self.per_page
+        rows = list(
+            self._ordered(self.descending)[offset:offset + self.per_page + 1]
+        )
+        has_next = len(rows) > self.per_page
+        return CursorPage(rows[:self.per_page], self, has_next, number > 1)
+
+    def get_page(self, after=None, before=None, number=None):
+        try:
+            number = int(number or 1)
+        except (TypeError, ValueError):
+            number = 1
+        if after is None and before is None and number > 1:
+            return self.page_by_number(number)
+        try:
+            return self.page(after=after, before=before)
+        except InvalidCursor:
+            return self.page()
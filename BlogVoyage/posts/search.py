@@ -0,0 +1,173 @@
+import re
+from contextlib import contextmanager
+
+from django.db import connection
+
+from .models import Post
+from .paginator import CursorPage, InvalidCursor, decode_cursor, encode_cursor
+
+FTS_TABLE = 'posts_post_fts'
+SEARCH_FIELDS = ('search_rank', 'pk')
+SEARCH_TYPES = (float, int)
+
+# Внешний content-индекс: сам текст хранится только в posts_post,
+# триггеры поддерживают индекс при любых изменениях, включая bulk_create
+# и queryset.update(). Миграция, пересоздающая таблицу posts_post
+# (в SQLite так меняется большинство столбцов), молча удаляет
+# триггеры: их наличие проверяет posts.checks, восстанавливает
+# команда rebuild_search_index
+TRIGGERS = tuple(f'{FTS_TABLE}_{suffix}' for suffix in ('ai', 'ad', 'au'))
+CREATE_SQL = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        text,
+        content='posts_post',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai
+        AFTER INSERT ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad
+        AFTER DELETE ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+            VALUES ('delete', old.id, old.text);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+        AFTER UPDATE OF text ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+            VALUES ('delete', old.id, old.text);
+            INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END""",
+)
+DROP_TRIGGERS_SQL = tuple(
+    f'DROP TRIGGER IF EXISTS {trigger}' for trigger in TRIGGERS
+)
+DROP_SQL = DROP_TRIGGERS_SQL + (f'DROP TABLE IF EXISTS {FTS_TABLE}',)
+REBUILD_SQL = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+
+
+def install(cursor):
+    """Создаёт индекс и триггеры (если их нет) и перестраивает индекс.
+
+    Пересоздание таблицы posts_post миграциями SQLite удаляет триггеры,
+    поэтому функция безопасна для повторного вызова.
+    """
+    for sql in CREATE_SQL:
+        cursor.execute(sql)
+    cursor.execute(REBUILD_SQL)
+
+
+def uninstall(cursor):
+    for sql in DROP_SQL:
+        cursor.execute(sql)
+
+
+@contextmanager
+def suspended():
+    """Отключает индекс на время массовой вставки постов.
+
+    Триггер обновляет индекс по строке за раз; после вставки индекс
+    перестраивается одним проходом, что для миллионов строк быстрее.
+    Удаляются только триггеры: таблица индекса остаётся, и поиск
+    по уже проиндексированным постам работает всё это время.
+    """
+    if not available():
+        yield
+        return
+    with connection.cursor() as cursor:
+        for sql in DROP_TRIGGERS_SQL:
+            cursor.execute(sql)
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            install(cursor)
+
+
+def missing_objects(cursor):
+    """Таблица индекса и триггеры, которых нет в базе."""
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE name IN "
+        f"({', '.join(['%s'] * (len(TRIGGERS) + 1))})",
+        [FTS_TABLE, *TRIGGERS],
+    )
+    found = {name for name, in cursor.fetchall()}
+    return [name for name in (FTS_TABLE, *TRIGGERS) if name not in found]
+
+
+def available():
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(query):
+    # Пользовательский ввод не должен попадать в синтаксис FTS5 напрямую:
+    # каждое слово экранируется и ищется по префиксу
+    words = re.findall(r'\w+', query)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def matching_ids_sql():
+    return f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+
+
+class SearchPaginator:
+    """Курсорная пагинация результатов поиска по (bm25, id)."""
+
+    def __init__(self, query, per_page):
+        self.expression = match_expression(query)
+        self.per_page = int(per_page)
+
+    def cursor_for(self, obj):
+        return encode_cursor(getattr(obj, field) for field in SEARCH_FIELDS)
+
+    def _ranked(self, values, forward):
+        rank = f'bm25({FTS_TABLE})'
+        sql = (
+            f'SELECT rowid, {rank} FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s'
+        )
+        params = [self.expression]
+        if values is not None:
+            sql += f' AND ({rank}, rowid) {">" if forward else "<"} (%s, %s)'
+            params.extend(values)
+        order = 'ASC' if forward else 'DESC'
+        sql += f' ORDER BY {rank} {order}, rowid {order} LIMIT %s'
+        params.append(self.per_page + 1)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def _posts(self, ranked):
+        posts = Post.objects.select_related('author', 'group').in_bulk(
+            [post_id for post_id, _ in ranked]
+        )
+        result = []
+        for post_id, rank in ranked:
+            if post_id in posts:
+                posts[post_id].search_rank = rank
+                result.append(posts[post_id])
+        return result
+
+    def page(self, after=None, before=None):
+        if not self.expression:
+            return CursorPage([], self, False, False)
+        if before is not None:
+            ranked = self._ranked(decode_cursor(before, SEARCH_TYPES), False)
+            has_previous = len(ranked) > self.per_page
+            ranked = ranked[:self.per_page]
+            ranked.reverse()
+            return CursorPage(self._posts(ranked), self, True, has_previous)
+        values = decode_cursor(after, SEARCH_TYPES) if after else None
+        ranked = self._ranked(values, True)
+        has_next = len(ranked) > self.per_page
+        return CursorPage(
+            self._posts(ranked[:self.per_page]), self, has_next,
+            after is not None
+        )
+
+    def get_page(self, after=None, before=None):
+        try:
+            return self.page(after=after, before=before)
+        except InvalidCursor:
+            return self.page()
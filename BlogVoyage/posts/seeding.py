@@ -0,0 +1,302 @@
+import random
+import re
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+from faker import Faker
+from PIL import Image, ImageDraw
+
+from . import search, timeline
+from .models import Comment, Follow, Group, Post, Timeline, UserCounters
+
+User = get_user_model()
+
+# Размер словарей Faker: строки собираются из готовых кусков,
+# чтобы не вызывать Faker на каждую из миллионов строк
+SENTENCES = 5000
+NAMES = 1000
+PLACEHOLDER_SIZE = (640, 480)
+PLACEHOLDER_DIR = 'posts/seed'
+# Порядок счётчиков пользователя при генерации
+POSTS, FOLLOWERS, FOLLOWING = range(3)
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def placeholder_images(count, seed=0):
+    """Картинки-заглушки для постов, создаются один раз и переиспользуются.
+
+    Возвращает имена файлов в хранилище; уже сгенерированные файлы
+    с тем же номером и зерном не перезаписываются.
+    """
+    rnd = random.Random(seed)
+    names = []
+    for number in range(count):
+        colors = [
+            tuple(rnd.randrange(256) for _ in range(3)) for _ in range(4)
+        ]
+        name = f'{PLACEHOLDER_DIR}/{seed}-{number}.jpg'
+        if not default_storage.exists(name):
+            image = Image.new('RGB', PLACEHOLDER_SIZE, colors[0])
+            draw = ImageDraw.Draw(image)
+            width, height = PLACEHOLDER_SIZE
+            for color in colors[1:]:
+                left, top = rnd.randrange(width), rnd.randrange(height)
+                draw.rectangle(
+                    (left, top, left + width // 3, top + height // 3),
+                    fill=color,
+                )
+            content = BytesIO()
+            image.save(content, 'JPEG', quality=70)
+            name = default_storage.save(name, ContentFile(content.getvalue()))
+        names.append(name)
+    return names
+
+
+class Seeder:
+    """Генератор правдоподобного набора данных для нагрузочных замеров.
+
+    Активность авторов распределена по степенному закону: немногие
+    пишут большую часть постов и собирают большую часть подписчиков.
+    Строки вставляются пачками через executemany в обход ORM и
+    сигналов, поэтому счётчики считаются здесь же, а поисковый индекс
+    перестраивается одним проходом после вставки постов. При одинаковом
+    ``seed`` на пустой базе получаются одни и те же данные.
+
+    ``images`` — число картинок-заглушек, которые получает примерно
+    ``image_share`` постов; ``progress`` вызывается после каждой пачки
+    с названием таблицы и числом вставленных в неё строк.
+    """
+
+    def __init__(self, posts, users=None, groups=None, follows=20,
+                 comments=1.0, images=0, image_share=0.3, batch_size=5000,
+                 seed=0, locale='ru_RU', progress=None):
+        self.posts = posts
+        self.users = users or max(posts // 20, 10)
+        self.groups = groups or max(posts // 2000, 5)
+        self.follows = follows
+        self.comments = comments
+        self.images = images
+        self.image_share = image_share
+        self.batch_size = batch_size
+        self.seed = seed
+        self.progress = progress
+        self.random = random.Random(seed)
+        # Вес автора по закону Ципфа: автор с рангом r пишет ~ 1/r постов
+        self.activity = list(accumulate(
+            1 / rank for rank in range(1, self.users + 1)
+        ))
+        fake = Faker(locale)
+        fake.seed_instance(seed)
+        self.sentences = [fake.sentence() for _ in range(SENTENCES)]
+        self.first_names = [fake.first_name() for _ in range(NAMES)]
+        self.last_names = [fake.last_name() for _ in range(NAMES)]
+        self.logins = [
+            re.sub(r'[^a-z0-9]', '', fake.user_name()) or 'user'
+            for _ in range(NAMES)
+        ]
+        self.now = timezone.now()
+        self.start = self.now - timedelta(days=365)
+
+    def _text(self, sentences):
+        return ' '.join(self.random.choices(self.sentences, k=sentences))
+
+    def _date(self, value):
+        return connection.ops.adapt_datetimefield_value(value)
+
+    def _pick_users(self, count):
+        return self.random.choices(
+            self.user_ids, cum_weights=self.activity, k=count
+        )
+
+    def _last_pk(self, model):
+        return model.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+
+    def _insert(self, model, fields, rows):
+        """Вставляет кортежи значений ``fields`` пачками по batch_size."""
+        meta = model._meta
+        quote = connection.ops.quote_name
+        columns = ', '.join(
+            quote(meta.get_field(field).column) for field in fields
+        )
+        sql = (
+            f'INSERT INTO {quote(meta.db_table)} ({columns}) '
+            f'VALUES ({", ".join(["%s"] * len(fields))})'
+        )
+        inserted = 0
+        for batch in _batches(rows, self.batch_size):
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, batch)
+            inserted += len(batch)
+            if self.progress is not None:
+                self.progress(meta.verbose_name_plural, inserted)
+
+    def _user_rows(self, first_pk):
+        rnd = self.random
+        step = (self.now - self.start) / self.users
+        for number in range(self.users):
+            # Номер после разделителя делает имя уникальным
+            username = f'{rnd.choice(self.logins)}_{first_pk + number}'
+            yield (
+                '!', False, username, rnd.choice(self.first_names),
+                rnd.choice(self.last_names), f'{username}@example.com',
+                False, True, self._date(self.start + step * number),
+            )
+
+    def seed_users(self):
+        last_pk = self._last_pk(User)
+        self._insert(
+            User,
+            ('password', 'is_superuser', 'username', 'first_name',
+             'last_name', 'email', 'is_staff', 'is_active', 'date_joined'),
+            self._user_rows(last_pk + 1),
+        )
+        self.user_ids = list(
+            User.objects.filter(pk__gt=last_pk)
+            .order_by('pk').values_list('pk', flat=True)
+        )
+        self.counters = {
+            user_id: [0, 0, 0] for user_id in self.user_ids
+        }
+
+    def seed_groups(self):
+        last_pk = self._last_pk(Group)
+        self._insert(Group, ('title', 'slug', 'description'), (
+            (
+                self.random.choice(self.sentences).rstrip('.'),
+                f'seed-{last_pk + number + 1}',
+                self._text(3),
+            )
+            for number in range(self.groups)
+        ))
+        self.group_ids = list(
+            Group.objects.filter(pk__gt=last_pk).values_list('pk', flat=True)
+        )
+
+    def _follow_rows(self):
+        rnd = self.random
+        for user_id in self.user_ids:
+            wanted = min(
+                int(rnd.paretovariate(1.5) * self.follows / 3),
+                self.users - 1,
+            )
+            authors = set(self._pick_users(wanted))
+            authors.discard(user_id)
+            for author_id in sorted(authors):
+                self.counters[author_id][FOLLOWERS] += 1
+                yield user_id, author_id
+            self.counters[user_id][FOLLOWING] += len(authors)
+
+    def seed_follows(self):
+        self._insert(Follow, ('user', 'author'), self._follow_rows())
+
+    def _post_rows(self):
+        rnd = self.random
+        images = placeholder_images(self.images, self.seed)
+        step = (self.now - self.start) / self.posts
+        for number, author_id in enumerate(self._pick_users(self.posts)):
+            self.counters[author_id][POSTS] += 1
+            yield (
+                self._text(rnd.randint(1, 6)),
+                self._date(self.start + step * number),
+                author_id,
+                (
+                    rnd.choice(self.group_ids) if rnd.random() < 0.6
+                    else None
+                ),
+                (
+                    rnd.choice(images)
+                    if images and rnd.random() < self.image_share else ''
+                ),
+                # Среднее (paretovariate(2) - 1) равно единице
+                min(int((rnd.paretovariate(2) - 1) * self.comments), 500),
+            )
+
+    def seed_posts(self):
+        self.first_post_pk = self._last_pk(Post) + 1
+        with search.suspended():
+            self._insert(
+                Post,
+                ('text', 'pub_date', 'author', 'group', 'image',
+                 'comments_count'),
+                self._post_rows(),
+            )
+
+    def _comment_rows(self):
+        rnd = self.random
+        posts = Post.objects.filter(
+            pk__gte=self.first_post_pk, comments_count__gt=0
+        ).order_by('pk').values_list('pk', 'pub_date', 'comments_count')
+        for post_id, pub_date, count in posts.iterator():
+            for author_id in self._pick_users(count):
+                yield (
+                    post_id, author_id, self._text(rnd.randint(1, 2)),
+                    self._date(pub_date + timedelta(
+                        minutes=rnd.randint(1, 60 * 24 * 7)
+                    )),
+                )
+
+    def seed_comments(self):
+        self._insert(
+            Comment, ('post', 'author', 'text', 'created'),
+            self._comment_rows()
+        )
+
+    def seed_counters(self):
+        self._insert(
+            UserCounters,
+            ('user', 'posts_count', 'followers_count', 'following_count'),
+            (
+                (user_id, *counts)
+                for user_id, counts in self.counters.items()
+            ),
+        )
+
+    def run(self):
+        self.seed_users()
+        self.seed_groups()
+        self.seed_follows()
+        self.seed_posts()
+        self.seed_comments()
+        self.seed_counters()
+        return self
+
+
+def fill_timelines(user_ids, batch_size=400, progress=None):
+    """Материализует ленты подписок так же, как это делает подписка.
+
+    Строить ленты всем читателям долго, поэтому команда seed по
+    умолчанию берёт только самых активных — тех, от чьего имени идут
+    замеры. Читатели перебираются пачками по batch_size: список id
+    целиком не уместился бы в лимит параметров запроса SQLite.
+    Возвращает число вставленных записей.
+    """
+    label = Timeline._meta.verbose_name_plural
+    inserted = 0
+    for readers in _batches(user_ids, batch_size):
+        pairs = Follow.objects.filter(user_id__in=readers).values_list(
+            'user_id', 'author_id'
+        )
+        for batch in _batches(pairs.iterator(), batch_size):
+            with transaction.atomic():
+                inserted += timeline.backfill_many(batch)
+            if progress is not None:
+                progress(label, inserted)
+    return inserted
@@ -0,0 +1,181 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import follow_graph, timeline
+from .caching import GLOBAL_SCOPE, bump
+from .counters import change_comments_count, change_user_counters
+from .models import Comment, Follow, Group, Post, UserCounters
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    timeline.prune(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_graph(sender, instance, **kwargs):
+    follow_graph.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def create_user_counters(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserCounters.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def count_posts(sender, instance, created=None, raw=False, **kwargs):
+    if created is None or (created and not raw):
+        change_user_counters(
+            instance.author_id, posts_count=1 if created else -1
+        )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def count_comments(sender, instance, created=None, raw=False, **kwargs):
+    if created is None or (created and not raw):
+        change_comments_count(instance.post_id, 1 if created else -1)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def count_follows(sender, instance, created=None, raw=False, **kwargs):
+    if created is None or (created and not raw):
+        delta = 1 if created else -1
+        change_user_counters(instance.author_id, followers_count=delta)
+        change_user_counters(instance.user_id, following_count=delta)
+
+
+@receiver(post_delete, sender=Follow)
+def refill_cooled_author(sender, instance, **kwargs):
+    # Счётчик уже уменьшен count_follows: ровно на пороге автор
+    # только что перестал быть «горячим»
+    followers_count = UserCounters.objects.filter(
+        user_id=instance.author_id
+    ).values_list('followers_count', flat=True).first()
+    if followers_count == settings.TIMELINE_FANOUT_LIMIT:
+        timeline.cool_down([instance.author_id])
+
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_save, sender=Group)
+def remember_previous_state(sender, instance, **kwargs):
+    field = 'group_id' if sender is Post else 'slug'
+    instance._previous_state = sender.objects.filter(
+        pk=instance.pk
+    ).values_list(field, flat=True).first() if instance.pk else None
+
+
+def _usernames(*user_ids):
+    return User.objects.filter(pk__in=user_ids).values_list(
+        'username', flat=True
+    )
+
+
+def _invalidate_post(post_id, author_id, *group_ids):
+    slugs = Group.objects.filter(pk__in=set(group_ids) - {None}).values_list(
+        'slug', flat=True
+    )
+    bump(
+        'index',
+        f'post:{post_id}',
+        f'card:post:{post_id}',
+        *(f'profile:{username}' for username in _usernames(author_id)),
+        *(f'group:{slug}' for slug in slugs)
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, created=None, **kwargs):
+    _invalidate_post(
+        instance.pk,
+        instance.author_id,
+        instance.group_id,
+        getattr(instance, '_previous_state', None)
+    )
+    if created is not False:
+        # Число постов автора выводится на страницах других его постов
+        bump(f'author:{instance.author_id}')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    # Число комментариев выводится и в лентах, где показан пост
+    post = Post.objects.filter(pk=instance.post_id).values(
+        'author_id', 'group_id'
+    ).first()
+    if post is None:
+        bump(f'post:{instance.post_id}')
+    else:
+        _invalidate_post(
+            instance.post_id, post['author_id'], post['group_id']
+        )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_pages(sender, instance, **kwargs):
+    previous_slug = getattr(instance, '_previous_state', None)
+    slugs = {instance.slug, previous_slug} - {None}
+    # Название и slug группы выводятся почти на всех страницах
+    bump(GLOBAL_SCOPE, *(f'group:{slug}' for slug in slugs))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_pages(sender, instance, **kwargs):
+    bump(f'author:{instance.author_id}', *(
+        f'profile:{username}'
+        for username in _usernames(instance.author_id, instance.user_id)
+    ))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_cards(sender, instance, **kwargs):
+    bump(f'card:group:{instance.pk}')
+
+
+# Поля пользователя, которые выводятся на страницах и в карточках постов
+USER_CARD_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(pre_save, sender=User)
+def remember_user_names(sender, instance, update_fields=None, **kwargs):
+    # Вход сохраняет только last_login: лишний запрос не нужен
+    instance._previous_names = User.objects.filter(
+        pk=instance.pk
+    ).values_list(*USER_CARD_FIELDS).first() if instance.pk and (
+        update_fields is None or set(USER_CARD_FIELDS) & set(update_fields)
+    ) else None
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_pages(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_names', None)
+    current = tuple(getattr(instance, field) for field in USER_CARD_FIELDS)
+    if previous is not None and previous != current:
+        # Имя выводится везде, где есть посты и комментарии пользователя,
+        # включая страницы целиком в кэше; переименования редки
+        bump(GLOBAL_SCOPE)
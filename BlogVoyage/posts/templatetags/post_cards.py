@@ -0,0 +1,48 @@
+from django import template
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from BlogVoyage.settings import CACHE_TIME
+from core.replica import reading_stale_replica
+
+from ..caching import GLOBAL_SCOPE, card_scopes, get_generations
+
+register = template.Library()
+
+CARD_KEY = 'card:{}:{}:{}'
+
+
+@register.simple_tag
+def post_cards(posts, template_name='posts/includes/post_card.html'):
+    """Выводит карточки постов, беря готовый HTML из кэша.
+
+    Ключ карточки включает поколения поста и группы, поэтому изменение
+    любого из них приводит к новой отрисовке. Поколение всего сайта
+    сбрасывает все карточки разом, например после импорта или смены
+    имени пользователя.
+    """
+    posts = list(posts)
+    scopes = [card_scopes(post) for post in posts]
+    site, *generations = get_generations((GLOBAL_SCOPE,) + sum(scopes, ()))
+    generations = iter(generations)
+    keys = [
+        CARD_KEY.format(
+            template_name,
+            post.pk,
+            '.'.join(
+                [str(site)]
+                + [str(next(generations)) for _ in post_scopes]
+            )
+        )
+        for post, post_scopes in zip(posts, scopes)
+    ]
+    cards = cache.get_many(keys)
+    missing = {}
+    for key, post in zip(keys, posts):
+        if key not in cards:
+            missing[key] = render_to_string(template_name, {'post': post})
+    if missing and not reading_stale_replica():
+        cache.set_many(missing, CACHE_TIME)
+    cards.update(missing)
+    return mark_safe('<hr>'.join(cards[key] for key in keys))
@@ -0,0 +1,143 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .. import benchmark
+from ..counters import reconcile
+from ..models import Comment, Follow, Post, Timeline, UserCounters
+from ..search import SearchPaginator
+from ..seeding import Seeder, fill_timelines
+
+
+class SeederTest(TestCase):
+    def test_seeded_counters_are_consistent(self):
+        """Счётчики, посчитанные при генерации, совпадают с данными"""
+        Seeder(300, users=30, comments=2).run()
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(Comment.objects.exists())
+        self.assertEqual(reconcile(), (0, 0))
+
+    def test_timelines_filled_for_readers(self):
+        """Лента строится для выбранных читателей"""
+        Seeder(100, users=10).run()
+        reader = benchmark.reader()
+        inserted = fill_timelines([reader.pk])
+        self.assertTrue(Timeline.objects.filter(user=reader).exists())
+        self.assertFalse(Timeline.objects.exclude(user=reader).exists())
+        self.assertEqual(inserted, Timeline.objects.count())
+
+    def test_timelines_filled_in_reader_batches(self):
+        """Читатели перебираются пачками, и записи всех пачек считаются"""
+        Seeder(100, users=10).run()
+        readers = list(Follow.objects.values_list('user', flat=True))
+        inserted = fill_timelines(readers, batch_size=2)
+        self.assertEqual(
+            set(Timeline.objects.values_list('user', flat=True)),
+            set(readers)
+        )
+        self.assertEqual(inserted, Timeline.objects.count())
+
+
+class SeedCommandTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+    def seed(self, **options):
+        last_pk = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        call_command(
+            'seed', posts=60, users=12, images=2, image_share=0.5,
+            seed=7, **{'stdout': StringIO(), 'timelines': 2, **options}
+        )
+        return Post.objects.filter(pk__gt=last_pk).order_by('pk')
+
+    def test_seed_is_deterministic_and_consistent(self):
+        """Команда заполняет базу с верными счётчиками, картинками,
+        лентами и поиском, а одно зерно даёт одинаковые тексты"""
+        posts = self.seed()
+        self.assertEqual(posts.count(), 60)
+        self.assertEqual(reconcile(), (0, 0))
+        self.assertEqual(
+            Timeline.objects.values('user').distinct().count(), 2
+        )
+        images = set(posts.exclude(image='').values_list('image', flat=True))
+        self.assertTrue(images)
+        for name in images:
+            self.assertTrue(default_storage.exists(name))
+        word = posts.first().text.split()[0]
+        self.assertTrue(SearchPaginator(word, 10).page().object_list)
+        texts = list(posts.values_list('text', flat=True))
+        self.assertEqual(
+            list(self.seed().values_list('text', flat=True)), texts
+        )
+
+    def test_timelines_built_for_most_active_readers(self):
+        """Ленты строятся самым активным читателям, а их записи входят
+        в отчёт о вставленных строках"""
+        stdout = StringIO()
+        self.seed(timelines=3, stdout=stdout)
+        readers = UserCounters.objects.order_by(
+            '-following_count', 'user'
+        ).values_list('user', flat=True)[:3]
+        self.assertEqual(
+            set(Timeline.objects.values_list('user', flat=True)),
+            set(readers)
+        )
+        self.assertIn(
+            f'{Timeline._meta.verbose_name_plural}: '
+            f'{Timeline.objects.count()}',
+            stdout.getvalue()
+        )
+
+
+@override_settings(CACHES=benchmark.NO_CACHE)
+class BenchmarkTest(TestCase):
+    def test_run_measures_every_view(self):
+        """Замер проходит по всем страницам и считает запросы"""
+        Seeder(100, users=10).run()
+        fill_timelines([benchmark.reader().pk])
+        results = benchmark.run(100, depths=(1, 2), iterations=2)
+        self.assertEqual(
+            {result['view'] for result in results}, set(benchmark.VIEWS)
+        )
+        for result in results:
+            self.assertGreater(result['queries'], 0)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+
+    def test_deep_pages_are_not_first_page(self):
+        """Курсор глубокой страницы ведёт дальше первой страницы, а за
+        концом ленты замер пропускается"""
+        Seeder(100, users=10).run()
+        target = benchmark.targets()[0]
+        first = self.client.get(target.url).context['page_obj']
+        query_string = target.query_string(3)
+        self.assertTrue(query_string.startswith('?after='))
+        deep = self.client.get(target.url + query_string).context['page_obj']
+        self.assertTrue(deep.has_previous())
+        self.assertFalse(set(first) & set(deep))
+        self.assertIsNone(target.query_string(1000))
+
+    def test_compare_reports_regressions(self):
+        """Рост числа запросов и задержки сверх допуска — регрессия"""
+        old = {'posts': 10, 'view': 'index', 'depth': 1, 'queries': 2,
+               'p50_ms': 10.0, 'p99_ms': 20.0}
+        baseline = {'results': [old]}
+        within = dict(old, p50_ms=12.0, p99_ms=29.0)
+        self.assertEqual(benchmark.compare([within], baseline, 0.25), [])
+        regressions = benchmark.compare(
+            [dict(old, queries=3, p99_ms=31.0)], baseline, 0.25
+        )
+        self.assertEqual(
+            [metric for _, metric, _, _ in regressions],
+            ['queries', 'p99_ms']
+        )
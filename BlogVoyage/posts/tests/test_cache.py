@@ -0,0 +1,88 @@
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from core.cache import SQLiteCache
+
+
+def _increment(location, times):
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.location = os.path.join(directory.name, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.location, {})
+
+    def test_values_round_trip(self):
+        """Значения любых типов читаются такими же, какими записаны"""
+        values = {'int': 5, 'text': 'пост', 'list': [1, 'a'], 'set': {1}}
+        self.cache.set_many(values)
+        self.assertEqual(self.cache.get_many(values), values)
+        self.assertIsNone(self.cache.get('missing'))
+
+    def test_many_keys_fit_parameter_limit(self):
+        """Чтение и удаление многих ключей укладываются в лимит
+        параметров старых сборок SQLite"""
+        cache = SQLiteCache(
+            self.location, {'OPTIONS': {'MAX_ENTRIES': 10000}}
+        )
+        cache._db.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+        cache.ACCESS_RESOLUTION = -1
+        values = {f'key-{number}': number for number in range(2500)}
+        cache.set_many(values)
+        self.assertEqual(cache.get_many(values), values)
+        cache.delete_many(values)
+        self.assertEqual(cache.get_many(values), {})
+
+    def test_expired_value_is_missing(self):
+        """Просроченный ключ не возвращается и может быть добавлен заново"""
+        self.cache.set('key', 'old', timeout=1)
+        time.sleep(1.1)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+        self.assertFalse(self.cache.add('key', 'newer'))
+        self.assertEqual(self.cache.get('key'), 'new')
+
+    def test_incr(self):
+        """incr работает только с существующим целым значением"""
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter', 5), 6)
+        self.assertEqual(self.cache.decr('counter'), 5)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_least_recently_used_keys_are_evicted(self):
+        """При переполнении вытесняются давно не читавшиеся ключи"""
+        cache = SQLiteCache(self.location, {'OPTIONS': {'MAX_ENTRIES': 10}})
+        cache.ACCESS_RESOLUTION = 0
+        cache.set_many({'cold': 'value', 'hot': 'value'})
+        for number in range(cache.CULL_EVERY - 2):
+            cache.get('hot')
+            cache.set(f'key-{number}', number)
+        self.assertIsNone(cache.get('cold'))
+        self.assertIsNone(cache.get('key-0'))
+        self.assertEqual(cache.get('hot'), 'value')
+
+    def test_shared_between_processes(self):
+        """Процессы видят один кэш, а incr не теряет обновлений"""
+        self.cache.set('counter', 0)
+        workers = [
+            multiprocessing.Process(
+                target=_increment, args=(self.location, 50)
+            )
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 200)
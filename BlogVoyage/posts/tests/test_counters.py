@@ -0,0 +1,83 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Post, UserCounters
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='counted')
+        cls.reader = User.objects.create_user(username='counter')
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(author=self.author, text='Пост')
+
+    def counters(self, user):
+        return UserCounters.objects.get(user=user)
+
+    def test_counters_follow_creation_and_deletion(self):
+        """Счётчики увеличиваются при создании и уменьшаются
+        при удалении объектов"""
+        comment = Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(self.counters(self.author).posts_count, 1)
+        self.assertEqual(self.counters(self.author).followers_count, 1)
+        self.assertEqual(self.counters(self.reader).following_count, 1)
+        comment.delete()
+        follow.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        self.assertEqual(self.counters(self.author).followers_count, 0)
+        self.assertEqual(self.counters(self.reader).following_count, 0)
+        self.post.delete()
+        self.assertEqual(self.counters(self.author).posts_count, 0)
+
+    def test_post_edit_keeps_comments_count(self):
+        """Сохранение устаревшего экземпляра поста не затирает счётчик"""
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        self.post.text = 'Изменённый пост'
+        self.post.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_reconcile_command_fixes_drift(self):
+        """Команда reconcile_counters исправляет рассинхронизацию"""
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        UserCounters.objects.filter(user=self.author).update(posts_count=42)
+        Post.objects.filter(pk=self.post.pk).update(comments_count=7)
+        UserCounters.objects.filter(user=self.reader).delete()
+        call_command('reconcile_counters', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(self.counters(self.author).posts_count, 1)
+        self.assertEqual(self.counters(self.reader).posts_count, 0)
+
+    def test_post_detail_does_not_count_author_posts(self):
+        """Страница поста берёт число постов автора из счётчика"""
+        with CaptureQueriesContext(connection) as queries:
+            response = Client().get(
+                reverse('posts:post_detail', args=(self.post.id,))
+            )
+        self.assertContains(response, 'Всего постов автора:<span>1</span>')
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'].upper())
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.db import connection
+from django.test import SimpleTestCase
+
+
+class SQLitePragmasTest(SimpleTestCase):
+    databases = {'default'}
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_new_connections_are_tuned(self):
+        """Каждое новое соединение получает настройки SQLITE_PRAGMAS"""
+        # WAL недоступен для базы в памяти, остальное проверяем
+        self.assertEqual(self.pragma('synchronous'), 1)
+        for name in ('busy_timeout', 'cache_size'):
+            with self.subTest(pragma=name):
+                self.assertEqual(
+                    self.pragma(name), settings.SQLITE_PRAGMAS[name]
+                )
@@ -0,0 +1,122 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.admin import helpers
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from .. import benchmark, follow_graph
+from ..counters import reconcile
+from ..deletion import BatchDeleter, delete_posts
+from ..models import Comment, Follow, Post, Timeline
+from ..seeding import Seeder, fill_timelines
+
+User = get_user_model()
+
+
+@override_settings(THUMBNAIL_WORKERS=0)
+class BatchDeletionTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+    def test_user_is_deleted_in_batches_with_consistent_counters(self):
+        """Пользователь удаляется пачками, счётчики остальных верны"""
+        Seeder(120, users=8, comments=3).run()
+        reader = benchmark.reader()
+        fill_timelines([reader.pk])
+        author = User.objects.order_by('-counters__posts_count').first()
+        follow_graph.following(reader.pk)
+        progress = []
+        deleter = BatchDeleter(
+            batch_size=10,
+            progress=lambda label, count: progress.append((label, count))
+        )
+        deleter.delete_user(author)
+        deleted = deleter.finish()
+        self.assertFalse(User.objects.filter(pk=author.pk).exists())
+        self.assertFalse(Post.objects.filter(author_id=author.pk).exists())
+        self.assertFalse(Comment.objects.filter(author_id=author.pk).exists())
+        self.assertFalse(
+            Follow.objects.filter(author_id=author.pk).exists()
+            or Follow.objects.filter(user_id=author.pk).exists()
+        )
+        self.assertFalse(
+            Timeline.objects.filter(post__author_id=author.pk).exists()
+        )
+        self.assertEqual(reconcile(), (0, 0))
+        self.assertNotIn(author.pk, follow_graph.following(reader.pk))
+        self.assertGreater(len(progress), len(deleted))
+        self.assertEqual(deleted['Пользователи'], 1)
+
+    def test_orphaned_images_are_removed(self):
+        """Файл картинки удаляется, только если на него не ссылаются
+        другие посты"""
+        author = User.objects.create_user(username='author')
+        default_storage.save('posts/own.gif', ContentFile(b'GIF89a'))
+        default_storage.save('posts/shared.gif', ContentFile(b'GIF89a'))
+        own = Post.objects.create(
+            author=author, text='1', image='posts/own.gif'
+        )
+        shared = Post.objects.create(
+            author=author, text='2', image='posts/shared.gif'
+        )
+        Post.objects.create(author=author, text='3', image='posts/shared.gif')
+        delete_posts(Post.objects.filter(pk__in=[own.pk, shared.pk]))
+        self.assertFalse(
+            os.path.exists(os.path.join(self.media_root, 'posts/own.gif'))
+        )
+        self.assertTrue(
+            os.path.exists(os.path.join(self.media_root, 'posts/shared.gif'))
+        )
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_admin_delete_action_shows_counts_and_deletes(self):
+        """Удаление из админки показывает число строк и удаляет пачками"""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        author = User.objects.create_user(username='author')
+        post = Post.objects.create(author=author, text='Пост')
+        Comment.objects.create(post=post, author=admin, text='Комментарий')
+        client = Client()
+        client.force_login(admin)
+        url = reverse('admin:auth_user_changelist')
+        data = {
+            'action': 'delete_selected',
+            helpers.ACTION_CHECKBOX_NAME: [author.pk],
+        }
+        response = client.post(url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Записи в блоге: 1')
+        self.assertContains(response, 'Комментарии: 1')
+        response = client.post(url, dict(data, post='yes'), follow=True)
+        self.assertFalse(User.objects.filter(pk=author.pk).exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertContains(response, 'посты — 1')
+
+    def test_admin_delete_view_deletes_with_one_message(self):
+        """Страница удаления поста удаляет его пачками и сообщает об этом
+        один раз"""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        post = Post.objects.create(author=admin, text='Пост')
+        Comment.objects.create(post=post, author=admin, text='Комментарий')
+        client = Client()
+        client.force_login(admin)
+        url = reverse('admin:posts_post_delete', args=[post.pk])
+        self.assertContains(client.get(url), 'Комментарии: 1')
+        response = client.post(url, {'post': 'yes'}, follow=True)
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(len(response.context['messages']), 1)
@@ -0,0 +1,103 @@
+import csv
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.http import StreamingHttpResponse
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='writer')
+        cls.reader = User.objects.create_user(username='reader')
+        group = Group.objects.create(title='Горы', slug='mountains')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Пост {number}', group=group,
+                image='posts/photo.jpg' if number == 0 else '',
+            )
+            for number in range(3)
+        ]
+        Post.objects.create(author=cls.reader, text='Чужой пост')
+        for post in cls.posts[:2]:
+            for number in range(2):
+                Comment.objects.create(
+                    post=post, author=cls.reader, text=f'Ответ {number}'
+                )
+
+    def setUp(self):
+        self.url = reverse('posts:profile_export', args=[self.author])
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def read(self, response):
+        self.assertIsInstance(response, StreamingHttpResponse)
+        return b''.join(response.streaming_content).decode()
+
+    def test_jsonl_export(self):
+        """Посты выгружаются вместе с комментариями и адресом картинки"""
+        with self.assertNumQueries(4):
+            content = self.read(self.client.get(self.url))
+        records = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(
+            [record['type'] for record in records],
+            ['post', 'comment', 'comment', 'post', 'comment', 'comment',
+             'post']
+        )
+        first = records[0]
+        self.assertEqual(first['id'], self.posts[0].pk)
+        self.assertEqual(first['group'], 'mountains')
+        self.assertEqual(
+            first['image_url'], 'http://testserver/media/posts/photo.jpg'
+        )
+        self.assertEqual(records[1]['post'], self.posts[0].pk)
+        self.assertEqual(records[1]['author'], 'reader')
+
+    def test_csv_export(self):
+        """CSV содержит по строке на пост и комментарий"""
+        response = self.client.get(self.url, {'format': 'csv'})
+        self.assertIn('writer.csv', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(self.read(response))))
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[-1]['text'], 'Пост 2')
+
+    def test_only_author_can_export(self):
+        """Чужие записи выгрузить нельзя"""
+        client = Client()
+        client.force_login(self.reader)
+        self.assertEqual(client.get(self.url).status_code, 403)
+        self.assertEqual(Client().get(self.url).status_code, 302)
+
+    def test_export_command_round_trip(self):
+        """Выгрузка команды читается командой импорта"""
+        output = io.StringIO()
+        call_command('export_content', 'writer', stdout=output)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 7)
+        Post.objects.filter(author=self.author).delete()
+        path = self.get_temporary_path('writer.jsonl')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(output.getvalue())
+        call_command('import_content', path, stdout=io.StringIO())
+        self.assertEqual(
+            Comment.objects.filter(post__author=self.author).count(), 4
+        )
+        self.assertEqual(
+            Post.objects.get(pk=self.posts[0].pk).image, 'posts/photo.jpg'
+        )
+
+    def get_temporary_path(self, name):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        return os.path.join(directory.name, name)
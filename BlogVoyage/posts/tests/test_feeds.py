@@ -0,0 +1,104 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class FeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='writer')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(title='Горы', slug='mountains')
+        Post.objects.create(
+            author=cls.author, text='Пост в группе', group=cls.group
+        )
+        Post.objects.create(author=cls.other, text='Пост без группы')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_feeds_list_matching_posts(self):
+        """Ленты сайта, группы и автора содержат только свои записи"""
+        both = {'Пост в группе', 'Пост без группы'}
+        cases = (
+            ('posts:feed', (), 'rss', both),
+            ('posts:feed_atom', (), 'atom', both),
+            ('posts:group_feed', (self.group.slug,), 'rss', {'Пост в группе'}),
+            (
+                'posts:group_feed_atom', (self.group.slug,), 'atom',
+                {'Пост в группе'}
+            ),
+            (
+                'posts:profile_feed', (self.other.username,), 'rss',
+                {'Пост без группы'}
+            ),
+            (
+                'posts:profile_feed_atom', (self.other.username,), 'atom',
+                {'Пост без группы'}
+            ),
+        )
+        for name, args, feed_type, texts in cases:
+            with self.subTest(feed=name):
+                response = self.client.get(reverse(name, args=args))
+                self.assertEqual(response.status_code, 200)
+                self.assertIn(feed_type, response['Content-Type'])
+                content = response.content.decode()
+                for text in both:
+                    self.assertEqual(text in content, text in texts)
+
+    def test_unknown_group_feed(self):
+        response = self.client.get(
+            reverse('posts:group_feed', args=['missing'])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_conditional_requests_are_free(self):
+        """Повторный опрос ленты получает 304 без запросов к базе"""
+        url = reverse('posts:feed')
+        response = self.client.get(url)
+        for headers in (
+            {'HTTP_IF_NONE_MATCH': response['ETag']},
+            {'HTTP_IF_MODIFIED_SINCE': response['Last-Modified']},
+        ):
+            with self.subTest(headers=headers):
+                with self.assertNumQueries(0):
+                    not_modified = self.client.get(url, **headers)
+                self.assertEqual(not_modified.status_code, 304)
+
+    def test_feed_is_invalidated_by_new_post(self):
+        url = reverse('posts:group_feed', args=[self.group.slug])
+        etag = self.client.get(url)['ETag']
+        Post.objects.create(
+            author=self.other, text='Свежий пост', group=self.group
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Свежий пост', response.content.decode())
+
+    def test_edit_and_delete_change_last_modified(self):
+        """Правка и удаление поста не дают ложного 304 по If-Modified-Since"""
+        url = reverse('posts:feed')
+        post = Post.objects.create(author=self.author, text='Черновик')
+
+        def edit():
+            post.text = 'Правка'
+            post.save()
+
+        for change, text in ((edit, 'Правка'), (post.delete, None)):
+            last_modified = self.client.get(url)['Last-Modified']
+            change()
+            with self.subTest(text=text):
+                response = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=last_modified
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    'Правка' in response.content.decode(), text == 'Правка'
+                )
@@ -1,8 +1,14 @@
+from array import array
+
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.db import transaction
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
 from django.urls import reverse
 
-from ..models import Follow, Post
+from .. import follow_graph
+from ..models import Follow, Post, Timeline
 
 User = get_user_model()
 
@@ -20,6 +26,7 @@ class FollowingTest(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.f_client = Client()
         self.f_client.force_login(self.f_user)
         self.uf_client = Client()
@@ -68,3 +75,148 @@ class FollowingTest(TestCase):
         """Проверка отсутствия поста неотслеживаемого автора"""
         response = self.uf_client.get(reverse('posts:follow_index'))
         self.assertNotIn(self.post, response.context.get('page_obj'))
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='writer')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.old_post = Post.objects.create(
+            author=cls.author,
+            text='Пост до подписки'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def follow_page(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_and_unfollow_prunes_timeline(self):
+        """Подписка добавляет старые посты автора в ленту,
+        отписка убирает их"""
+        self.client.get(reverse('posts:profile_follow', args=(self.author,)))
+        self.assertTrue(Timeline.objects.filter(
+            user=self.reader, post=self.old_post
+        ).exists())
+        self.assertEqual(self.follow_page(), [self.old_post])
+        self.client.get(
+            reverse('posts:profile_unfollow', args=(self.author,))
+        )
+        self.assertFalse(Timeline.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.follow_page(), [])
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        """Новый пост раскладывается по лентам подписчиков"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertTrue(Timeline.objects.filter(
+            user=self.reader, post=post
+        ).exists())
+        self.assertEqual(self.follow_page(), [post, self.old_post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_author_below_limit_gets_posts_fanned_out(self):
+        """Посты, написанные, пока автор был «горячим», остаются в ленте
+        после того, как подписчиков стало меньше порога"""
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        follow = Follow.objects.create(user=other, author=self.author)
+        post = Post.objects.create(author=self.author, text='Горячий пост')
+        self.assertFalse(Timeline.objects.filter(post=post).exists())
+        follow.delete()
+        self.assertTrue(Timeline.objects.filter(
+            user=self.reader, post=post
+        ).exists())
+        self.assertEqual(self.follow_page(), [post, self.old_post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_hot_author_posts_are_read_on_demand(self):
+        """Посты «горячего» автора не раскладываются по лентам,
+        но попадают в ленту подписки при чтении"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Горячий пост')
+        self.assertFalse(Timeline.objects.filter(post=post).exists())
+        self.assertEqual(self.follow_page(), [post, self.old_post])
+
+
+class FollowGraphTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{index}')
+            for index in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_follow_checks_are_served_from_cache(self):
+        """После первого чтения проверки подписки не обращаются к базе"""
+        first, second, third = self.authors
+        Follow.objects.create(user=self.reader, author=third)
+        Follow.objects.create(user=self.reader, author=first)
+        self.assertEqual(
+            list(follow_graph.following(self.reader.pk)),
+            [first.pk, third.pk]
+        )
+        with self.assertNumQueries(0):
+            self.assertTrue(
+                follow_graph.is_following(self.reader.pk, first.pk)
+            )
+            self.assertFalse(
+                follow_graph.is_following(self.reader.pk, second.pk)
+            )
+            self.assertEqual(
+                follow_graph.followed_among(
+                    self.reader.pk, [second.pk, third.pk]
+                ),
+                [third.pk]
+            )
+            self.assertFalse(follow_graph.is_following(None, first.pk))
+
+    def test_repeated_follow_and_missing_unfollow(self):
+        """Повторная подписка ничего не создаёт, отписка без подписки — 404"""
+        client = Client()
+        client.force_login(self.reader)
+        author = self.authors[0]
+        follow_url = reverse('posts:profile_follow', args=(author,))
+        client.get(follow_url)
+        client.get(follow_url)
+        self.assertEqual(
+            Follow.objects.filter(user=self.reader, author=author).count(), 1
+        )
+        other = reverse('posts:profile_unfollow', args=(self.authors[1],))
+        self.assertEqual(client.get(other).status_code, 404)
+
+
+class FollowGraphInvalidationTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='reader')
+        self.author = User.objects.create_user(username='author')
+
+    def test_follow_signals_invalidate_graph(self):
+        """Подписка и отписка сразу видны в кэше подписок"""
+        reader, author = self.reader.pk, self.author.pk
+        self.assertFalse(follow_graph.is_following(reader, author))
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertTrue(follow_graph.is_following(reader, author))
+        follow.delete()
+        self.assertFalse(follow_graph.is_following(reader, author))
+
+    def test_graph_is_invalidated_after_commit(self):
+        """Список, закэшированный до COMMIT, удаляется после фиксации"""
+        reader, author = self.reader.pk, self.author.pk
+        with transaction.atomic():
+            Follow.objects.create(user=self.reader, author=self.author)
+            # Так выглядит чтение из другого запроса до фиксации
+            cache.set(follow_graph.FOLLOWING_KEY.format(reader), array('I'))
+        self.assertTrue(follow_graph.is_following(reader, author))
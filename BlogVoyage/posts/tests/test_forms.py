@@ -1,13 +1,17 @@
 import shutil
 import tempfile
+from io import BytesIO
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 from ..models import Post
+from ..thumbnails import submit
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -20,6 +24,7 @@ class PostCreationFormTests(TestCase):
         cls.user = User.objects.create_user(username='author')
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.user_client = Client()
         self.user_client.force_login(self.user)
@@ -126,6 +131,7 @@ class PostCreationImagesTest(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.client = Client()
         self.client.force_login(self.user)
 
@@ -169,6 +175,85 @@ class PostCreationImagesTest(TestCase):
             ).exists()
         )
 
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_thumbnails_are_pregenerated(self):
+        """Проверка предварительной генерации миниатюр для картинки поста"""
+        from sorl.thumbnail import default
+        from sorl.thumbnail.images import ImageFile
+
+        image = BytesIO()
+        Image.new('RGB', (40, 20), 'purple').save(image, 'PNG')
+        post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('thumb.png', image.getvalue()),
+        )
+        submit(post.image.name)
+        for geometry, options in settings.THUMBNAIL_PRESETS:
+            with self.subTest(geometry=geometry):
+                thumbnail = default.backend.get_thumbnail(
+                    post.image, geometry, **options
+                )
+                self.assertTrue(default.kvstore.get(ImageFile(thumbnail)))
+                self.assertTrue(thumbnail.exists())
+
+    def upload(self, name, image, image_format, **save_options):
+        content = BytesIO()
+        image.save(content, image_format, **save_options)
+        return self.client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'Пост с большой картинкой',
+                'image': SimpleUploadedFile(name, content.getvalue()),
+            },
+            follow=True
+        )
+
+    @override_settings(IMAGE_MAX_SIDE=100)
+    def test_large_image_is_downscaled_without_metadata(self):
+        """Проверка уменьшения оригинала и удаления метаданных"""
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        self.upload(
+            'big.jpg', Image.new('RGB', (400, 200), 'red'), 'JPEG',
+            exif=exif.tobytes()
+        )
+        post = Post.objects.get(text='Пост с большой картинкой')
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.size, (100, 50))
+            self.assertFalse(stored.getexif())
+
+    @override_settings(IMAGE_MAX_SIDE=100)
+    def test_other_formats_and_animations_are_reencoded(self):
+        """BMP пересохраняется в PNG, от анимации остаётся первый кадр,
+        и оба уменьшаются"""
+        frames = [Image.new('P', (400, 200), color) for color in (1, 2)]
+        for name, image, image_format, options, stored_format in (
+            ('big.bmp', Image.new('RGB', (400, 200)), 'BMP', {}, 'PNG'),
+            ('big.gif', frames[0], 'GIF',
+             {'save_all': True, 'append_images': frames[1:]}, 'GIF'),
+        ):
+            with self.subTest(name=name):
+                Post.objects.filter(text='Пост с большой картинкой').delete()
+                self.upload(name, image, image_format, **options)
+                post = Post.objects.get(text='Пост с большой картинкой')
+                with Image.open(post.image.path) as stored:
+                    self.assertEqual(stored.format, stored_format)
+                    self.assertEqual(stored.size, (100, 50))
+                    self.assertFalse(getattr(stored, 'is_animated', False))
+
+    @override_settings(IMAGE_MAX_PIXELS=100)
+    def test_image_above_pixel_budget_is_rejected(self):
+        """Проверка отказа в загрузке картинки сверх лимита пикселей"""
+        response = self.upload('huge.png', Image.new('L', (20, 10)), 'PNG')
+        self.assertFormError(
+            response, 'form', 'image',
+            errors='Картинка слишком большая: 20×10 пикселей.'
+        )
+        self.assertFalse(
+            Post.objects.filter(text='Пост с большой картинкой').exists()
+        )
+
     def test_only_image_could_be_uploaded_in_post_form(self):
         """Проверка невозможности загрузки не-картинок в форму"""
         uploaded = SimpleUploadedFile(
@@ -0,0 +1,115 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from ..models import Comment, Follow, Group, Post, Timeline
+
+User = get_user_model()
+
+RECORDS = [
+    {'type': 'group', 'slug': 'mountains', 'title': 'Горы'},
+    {'type': 'user', 'username': 'reader'},
+    {'type': 'follow', 'user': 'reader', 'author': 'writer'},
+    {'type': 'post', 'id': 500, 'author': 'writer', 'text': 'Эльбрус',
+     'group': 'mountains', 'pub_date': '2020-05-01T10:00:00'},
+    {'type': 'comment', 'post': 500, 'author': 'reader', 'text': 'Круто',
+     'created': '2020-05-02T08:00:00'},
+]
+
+
+class ImportContentTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write(self, name, lines):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(lines) + '\n')
+        return path
+
+    def run_import(self, path, *args):
+        call_command('import_content', path, *args, stdout=StringIO())
+
+    def test_jsonl_import(self):
+        """Записи всех типов импортируются, счётчики и лента согласованы"""
+        path = self.write(
+            'data.jsonl', [json.dumps(record) for record in RECORDS]
+        )
+        self.run_import(path, '--chunk-size', '1')
+        post = Post.objects.get(pk=500)
+        self.assertEqual(post.author.username, 'writer')
+        self.assertEqual(post.group.slug, 'mountains')
+        self.assertEqual(post.pub_date.year, 2020)
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(post.comments.get().created.day, 2)
+        self.assertEqual(Group.objects.get(slug='mountains').title, 'Горы')
+        reader = User.objects.get(username='reader')
+        self.assertTrue(
+            Follow.objects.filter(user=reader, author=post.author).exists()
+        )
+        self.assertEqual(reader.counters.following_count, 1)
+        self.assertEqual(post.author.counters.posts_count, 1)
+        self.assertTrue(
+            Timeline.objects.filter(user=reader, post=post).exists()
+        )
+        self.assertFalse(os.path.exists(f'{path}.progress'))
+
+    def test_csv_import(self):
+        """CSV-файл одного типа импортируется с параметром --type"""
+        path = self.write('posts.csv', [
+            'author,text,group',
+            'writer,"Первый, с запятой",',
+            'writer,Второй,sea',
+        ])
+        self.run_import(path, '--type', 'post')
+        self.assertEqual(
+            set(Post.objects.values_list('text', flat=True)),
+            {'Первый, с запятой', 'Второй'}
+        )
+        self.assertTrue(Group.objects.filter(slug='sea').exists())
+
+    def test_resume_after_failure(self):
+        """После ошибки импорт продолжается с последней пачки"""
+        lines = [json.dumps(record) for record in RECORDS]
+        path = self.write('data.jsonl', lines + ['{"type": "unknown"}'])
+        with self.assertRaises(CommandError):
+            self.run_import(path, '--chunk-size', '5')
+        self.assertEqual(Comment.objects.count(), 1)
+        with self.assertRaises(CommandError):
+            self.run_import(path)
+        extra = {'type': 'comment', 'post': 500, 'author': 'writer',
+                 'text': 'Ещё'}
+        self.write('data.jsonl', lines + [json.dumps(extra)])
+        self.run_import(path, '--resume')
+        self.assertEqual(Comment.objects.count(), 2)
+        self.assertEqual(Post.objects.get(pk=500).comments_count, 2)
+
+    def test_post_id_collision_is_an_error(self):
+        """Занятый id поста останавливает импорт, комментарии не теряются"""
+        author = User.objects.create_user(username='owner')
+        Post.objects.create(pk=500, author=author, text='Старый')
+        path = self.write(
+            'data.jsonl', [json.dumps(record) for record in RECORDS]
+        )
+        with self.assertRaisesMessage(CommandError, '[500]'):
+            self.run_import(path)
+        self.assertEqual(Post.objects.get(pk=500).text, 'Старый')
+        self.assertFalse(Comment.objects.exists())
+
+    def test_malformed_line_reports_its_number(self):
+        """Битая строка JSON превращается в ошибку команды с номером"""
+        path = self.write('data.jsonl', [
+            json.dumps(RECORDS[0]), '{"type": "user",', json.dumps(RECORDS[1]),
+        ])
+        with self.assertRaisesMessage(CommandError, 'Строка 2'):
+            self.run_import(path, '--chunk-size', '1')
+        self.assertTrue(Group.objects.filter(slug='mountains').exists())
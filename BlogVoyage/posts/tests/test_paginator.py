@@ -0,0 +1,107 @@
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from BlogVoyage.settings import POSTS_PER_PAGE
+
+from ..models import Group, Post
+from ..paginator import CursorPaginator, decode_cursor, encode_cursor
+
+User = get_user_model()
+
+
+class CursorPaginatorTest(TestCase):
+    NUM_OF_POSTS = 25
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='cursor')
+        cls.group = Group.objects.create(
+            title='Группа курсоров',
+            slug='cursor_group',
+            description='Тестовое описание'
+        )
+        for number in range(cls.NUM_OF_POSTS):
+            Post.objects.create(
+                author=cls.user,
+                text=f'Пост {number}',
+                group=cls.group,
+            )
+        cls.feeds = (
+            '/',
+            '/group/cursor_group/',
+            '/profile/cursor/',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest = Client()
+
+    def test_cursor_roundtrip(self):
+        """Курсор кодирует и декодирует значения ключа без потерь"""
+        post = Post.objects.first()
+        token = encode_cursor((post.pub_date, post.pk))
+        self.assertEqual(
+            decode_cursor(token, (datetime, int)),
+            [post.pub_date, post.pk]
+        )
+
+    def test_walk_forward_and_back_through_feeds(self):
+        """Переход по ссылкам next/prev обходит все посты без повторов
+        и возвращает на исходную страницу"""
+        expected = list(Post.objects.order_by('-pub_date', '-pk'))
+        for feed in self.feeds:
+            with self.subTest(feed=feed):
+                pages = []
+                response = self.guest.get(feed)
+                while True:
+                    page = response.context['page_obj']
+                    pages.append(list(page))
+                    if not page.has_next():
+                        break
+                    response = self.guest.get(
+                        feed, {'after': page.next_cursor()}
+                    )
+                self.assertEqual(sum(pages, []), expected)
+                response = self.guest.get(
+                    feed, {'before': page.previous_cursor()}
+                )
+                self.assertEqual(list(response.context['page_obj']),
+                                 pages[-2])
+
+    def test_feed_does_not_count_posts(self):
+        """Страница ленты не выполняет COUNT по таблице постов"""
+        token = CursorPaginator(
+            Post.objects.all(), POSTS_PER_PAGE
+        ).page().next_cursor()
+        for feed in self.feeds:
+            with self.subTest(feed=feed):
+                with CaptureQueriesContext(connection) as queries:
+                    self.guest.get(feed, {'after': token})
+                for query in queries.captured_queries:
+                    self.assertNotIn('COUNT(', query['sql'].upper())
+                    self.assertNotIn('OFFSET', query['sql'].upper())
+
+    def test_broken_cursor_returns_first_page(self):
+        """Испорченный курсор приводит к первой странице"""
+        post = Post.objects.first()
+        cursors = (
+            'мусор',
+            # Дата правильной формы, но несуществующая
+            encode_cursor(['2020-13-45T10:00:00+00:00', post.pk]),
+            # Строка вместо id и число вместо даты
+            encode_cursor([post.pub_date, str(post.pk)]),
+            encode_cursor([1588327200, post.pk]),
+        )
+        for cursor in cursors:
+            for direction in ('after', 'before'):
+                with self.subTest(cursor=cursor, direction=direction):
+                    response = self.guest.get('/', {direction: cursor})
+                    page = response.context['page_obj']
+                    self.assertEqual(len(page), POSTS_PER_PAGE)
+                    self.assertFalse(page.has_previous())
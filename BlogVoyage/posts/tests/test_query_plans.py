@@ -0,0 +1,110 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import benchmark
+from ..models import Post
+from ..paginator import CursorPaginator
+from ..seeding import Seeder, fill_timelines
+
+# Полный проход по таблице без индекса и сортировка во временном B-дереве.
+# «SCAN t USING INDEX» — это чтение по индексу в нужном порядке, его
+# останавливает LIMIT, поэтому оно не считается полным проходом.
+FULL_SCAN = re.compile(r'^SCAN (?!.*\bUSING\b)(?!CONSTANT ROW)')
+TEMP_SORT = re.compile(r'USE TEMP B-TREE')
+# Переход по курсору начинается с поиска по индексу от его даты
+SEEK = re.compile(r'^SEARCH .*\bUSING (COVERING )?INDEX .*\bpub_date<\?')
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def plan_problems(queries):
+    """Строки планов, в которых запрос читает всю таблицу или сортирует."""
+    problems = []
+    for query in queries:
+        sql = query['sql']
+        if not sql.lstrip().upper().startswith('SELECT'):
+            continue
+        for detail in explain(sql):
+            if FULL_SCAN.search(detail) or TEMP_SORT.search(detail):
+                problems.append(f'{detail}: {sql}')
+    return problems
+
+
+@override_settings(CACHES=benchmark.NO_CACHE)
+class QueryPlanTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Seeder(200, users=20, comments=2).run()
+        cls.reader = benchmark.reader()
+        fill_timelines([cls.reader.pk])
+
+    def assertIndexedQueries(self, url, user=None):
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(captured.captured_queries)
+        self.assertEqual(plan_problems(captured.captured_queries), [])
+        return [
+            detail
+            for query in captured.captured_queries
+            if query['sql'].lstrip().upper().startswith('SELECT')
+            for detail in explain(query['sql'])
+        ]
+
+    def test_feed_pages_use_indexes(self):
+        """Страницы лент читаются по индексам без сортировки в памяти,
+        следующая страница — поиском по индексу от курсора"""
+        for target in benchmark.targets():
+            with self.subTest(view=target.view, depth=1):
+                self.assertIndexedQueries(target.url, target.user)
+            if target.queryset is None:
+                continue
+            with self.subTest(view=target.view, depth=2):
+                cursor = CursorPaginator(
+                    target.queryset, settings.POSTS_PER_PAGE, target.fields
+                ).page().next_cursor()
+                self.assertIsNotNone(cursor)
+                plans = self.assertIndexedQueries(
+                    f'{target.url}?after={cursor}', target.user
+                )
+                self.assertTrue(
+                    any(SEEK.search(detail) for detail in plans), plans
+                )
+
+    def test_comments_and_syndication_use_indexes(self):
+        """Комментарии и RSS-ленты тоже обходятся без полных проходов"""
+        post = Post.objects.order_by('-comments_count').first()
+        author = post.author
+        urls = (
+            reverse('posts:post_comments', args=[post.pk]),
+            reverse('posts:feed'),
+            reverse('posts:profile_feed', args=[author.username]),
+        )
+        group = Post.objects.exclude(group=None).first().group
+        urls += (reverse('posts:group_feed', args=[group.slug]),)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertIndexedQueries(url)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_follow_feed_with_hot_authors_uses_indexes(self):
+        """Лента с «горячими» авторами читается по индексу дат"""
+        self.assertIndexedQueries(reverse('posts:follow_index'), self.reader)
+
+    def test_full_scan_is_reported(self):
+        """Запрос без подходящего индекса считается проблемой"""
+        queryset = Post.objects.order_by('text')
+        problems = plan_problems([{'sql': str(queryset.query)}])
+        self.assertTrue(problems)
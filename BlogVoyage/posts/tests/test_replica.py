@@ -0,0 +1,145 @@
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import replica
+
+from .. import follow_graph, timeline
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class ReplicaRouterTest(TransactionTestCase):
+    # В тестах реплика — зеркало основной базы, поэтому проверяется
+    # только выбор соединения
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='writer')
+        self.post = Post.objects.create(author=self.author, text='Пост')
+        self.client = Client()
+
+    def tearDown(self):
+        cache.clear()
+
+    def mark_synced(self, synced_at=None):
+        cache.set(
+            replica.SYNCED_KEY.format('replica'),
+            time.time() if synced_at is None else synced_at, None
+        )
+
+    def get(self, url, client=None):
+        with CaptureQueriesContext(connections['replica']) as reads:
+            response = (client or self.client).get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(reads)
+
+    def test_reads_stay_on_primary_without_fresh_replica(self):
+        """Пока реплику не копировали или копия устарела, читаем основную
+        базу"""
+        url = reverse('posts:index')
+        self.assertEqual(self.get(url)[1], 0)
+        cache.clear()
+        self.mark_synced(time.time() - 3600)
+        self.assertEqual(self.get(url)[1], 0)
+
+    def test_feed_reads_go_to_fresh_replica(self):
+        """Ленты и страница поста читаются со свежей реплики"""
+        self.mark_synced()
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:post_detail', args=[self.post.pk]),
+            reverse('posts:profile_feed', args=[self.author.username]),
+        ):
+            with self.subTest(url=url):
+                response, reads = self.get(url)
+                self.assertGreater(reads, 0)
+                self.assertIn('ETag', response)
+
+    def test_writer_reads_own_writes_from_primary(self):
+        """После комментария браузер автора читает с основной базы"""
+        self.mark_synced()
+        client = Client()
+        client.force_login(self.author)
+        response = client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Свой комментарий'},
+        )
+        self.assertIn(replica.STICKY_COOKIE, response.cookies)
+        response, reads = self.get(
+            reverse('posts:post_detail', args=[self.post.pk]), client
+        )
+        self.assertEqual(reads, 0)
+        self.assertContains(response, 'Свой комментарий')
+
+    def test_page_from_lagging_replica_is_not_cached(self):
+        """Страница, собранная по копии старше последней записи, не
+        попадает в кэш страниц и не получает ETag"""
+        self.mark_synced(time.time() - 1)
+        Post.objects.create(author=self.author, text='Новый пост')
+        url = reverse('posts:profile', args=[self.author.username])
+        response, reads = self.get(url)
+        self.assertGreater(reads, 0)
+        self.assertNotIn('ETag', response)
+        self.assertGreater(self.get(url)[1], 0)
+
+    def test_write_to_other_scope_keeps_page_cacheable(self):
+        """Запись в чужую область не мешает кэшировать страницу,
+        собранную по копии старше этой записи"""
+        Group.objects.create(title='Горы', slug='mountains')
+        self.mark_synced()
+        Post.objects.create(author=self.author, text='Новый пост')
+        profile = reverse('posts:profile', args=[self.author.username])
+        self.assertNotIn('ETag', self.get(profile)[0])
+        url = reverse('posts:group_list', args=['mountains'])
+        response, reads = self.get(url)
+        self.assertGreater(reads, 0)
+        self.assertIn('ETag', response)
+        self.assertEqual(self.get(url)[1], 0)
+
+    def test_follow_graph_reads_primary(self):
+        """Подписки и «горячие» авторы читаются с основной базы и
+        кэшируются даже при отставшей копии"""
+        token = replica.current_replica.set(('replica', True))
+        try:
+            with CaptureQueriesContext(connections['replica']) as reads:
+                follow_graph.following(self.author.pk)
+                timeline.hot_authors()
+        finally:
+            replica.current_replica.reset(token)
+        self.assertEqual(len(reads), 0)
+        self.assertIsNotNone(
+            cache.get(follow_graph.FOLLOWING_KEY.format(self.author.pk))
+        )
+        self.assertIsNotNone(cache.get(timeline.HOT_AUTHORS_KEY))
+
+    def test_sync_copies_primary(self):
+        """Синхронизация копирует основную базу в файл реплики"""
+        connection = connections['replica']
+        settings_dict = connection.settings_dict
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'replica.sqlite3')
+            connection.settings_dict = dict(settings_dict, NAME=path)
+            try:
+                replica.sync('replica')
+            finally:
+                connection.settings_dict = settings_dict
+            copy = sqlite3.connect(path)
+            try:
+                texts = copy.execute(
+                    f'SELECT text FROM {Post._meta.db_table}'
+                ).fetchall()
+            finally:
+                copy.close()
+        self.assertEqual(texts, [('Пост',)])
+        self.assertIsNotNone(cache.get(replica.SYNCED_KEY.format('replica')))
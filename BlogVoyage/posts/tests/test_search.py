@@ -0,0 +1,108 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import search
+from ..checks import check_search_index
+from ..models import Post
+from ..search import SearchPaginator
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='searcher')
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin'
+        )
+
+    def setUp(self):
+        self.guest = Client()
+        self.strong = Post.objects.create(
+            author=self.user, text='Путешествие путешествие по горам'
+        )
+        self.weak = Post.objects.create(
+            author=self.user,
+            text='Длинный рассказ о море, лесе, городах и одном путешествии'
+        )
+        Post.objects.create(author=self.user, text='Совсем другой пост')
+
+    def search(self, query, **params):
+        response = self.guest.get(
+            reverse('posts:search'), {'q': query, **params}
+        )
+        return response, list(response.context['page_obj'])
+
+    def test_search_ranks_results_with_bm25(self):
+        """Поиск находит посты по префиксу слова и сортирует их
+        по релевантности"""
+        response, posts = self.search('путешеств')
+        self.assertTemplateUsed(response, 'posts/search.html')
+        self.assertEqual(posts, [self.strong, self.weak])
+
+    def test_index_follows_edits_and_deletions(self):
+        """Индекс обновляется при изменении и удалении постов"""
+        Post.objects.filter(pk=self.weak.pk).update(text='Про котов')
+        self.assertEqual(self.search('котов')[1], [self.weak])
+        self.assertNotIn(self.weak, self.search('путешествие')[1])
+        self.strong.delete()
+        self.assertEqual(self.search('путешествие')[1], [])
+
+    def test_search_pages_with_cursor(self):
+        """Результаты поиска разбиваются на страницы курсором"""
+        paginator = SearchPaginator('путешеств', 1)
+        first = paginator.get_page()
+        second = paginator.get_page(after=first.next_cursor())
+        self.assertEqual(list(first) + list(second), [self.strong, self.weak])
+        self.assertFalse(second.has_next())
+        back = paginator.get_page(before=second.previous_cursor())
+        self.assertEqual(list(back), [self.strong])
+
+    def test_query_syntax_is_escaped(self):
+        """Спецсимволы FTS5 в запросе не приводят к ошибке"""
+        response, posts = self.search('"путешествие" OR (NEAR')
+        self.assertEqual(response.status_code, 200)
+        response, posts = self.search('')
+        self.assertEqual(posts, [])
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке использует полнотекстовый индекс"""
+        client = Client()
+        client.force_login(self.admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'горам'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.strong]
+        )
+
+    def test_check_detects_lost_triggers(self):
+        """Проверка сообщает о пропавших триггерах индекса"""
+        self.assertEqual(check_search_index(None), [])
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {search.TRIGGERS[0]}')
+        errors = check_search_index(None)
+        self.assertEqual([error.id for error in errors], ['posts.W001'])
+        self.assertIn(search.TRIGGERS[0], errors[0].msg)
+        with connection.cursor() as cursor:
+            search.install(cursor)
+        self.assertEqual(check_search_index(None), [])
+
+    def test_suspended_keeps_index_table(self):
+        """На время массовой вставки снимаются только триггеры: поиск
+        по старым постам работает, новые попадают в индекс после"""
+        def found(query):
+            return list(SearchPaginator(query, 10).page())
+
+        with search.suspended():
+            with connection.cursor() as cursor:
+                self.assertEqual(
+                    search.missing_objects(cursor), list(search.TRIGGERS)
+                )
+            self.assertEqual(found('горам'), [self.strong])
+            post = Post.objects.create(author=self.user, text='Лавина')
+        self.assertEqual(found('лавина'), [post])
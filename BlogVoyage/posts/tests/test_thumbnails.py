@@ -0,0 +1,104 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.test import (Client, SimpleTestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+from PIL import Image
+
+from .. import thumbnails
+from ..models import Post
+
+User = get_user_model()
+
+
+def png(name, color):
+    content = BytesIO()
+    Image.new('RGB', (40, 20), color).save(content, 'PNG')
+    return SimpleUploadedFile(name, content.getvalue())
+
+
+@override_settings(THUMBNAIL_WORKERS=0)
+class ThumbnailQueueTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.user = User.objects.create_user(username='author')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def thumbnail_count(self):
+        return sum(
+            len(names) for _, _, names in os.walk(
+                os.path.join(self.media_root, 'cache')
+            )
+        )
+
+    def test_thumbnails_are_queued_after_commit(self):
+        """Миниатюры строятся только после фиксации транзакции"""
+        with transaction.atomic():
+            post = Post.objects.create(
+                author=self.user, text='Пост', image=png('a.png', 'red')
+            )
+            thumbnails.queue_thumbnails(post)
+            self.assertEqual(self.thumbnail_count(), 0)
+        self.assertEqual(
+            self.thumbnail_count(), len(settings.THUMBNAIL_PRESETS)
+        )
+
+    def test_create_and_edit_views_queue_thumbnails(self):
+        """Создание поста и замена картинки строят миниатюры"""
+        self.client.post(
+            reverse('posts:post_create'),
+            {'text': 'Пост', 'image': png('created.png', 'green')},
+        )
+        post = Post.objects.get()
+        presets = len(settings.THUMBNAIL_PRESETS)
+        self.assertEqual(self.thumbnail_count(), presets)
+        self.client.post(
+            reverse('posts:post_edit', args=[post.pk]),
+            {'text': 'Пост', 'image': png('edited.png', 'blue')},
+        )
+        post.refresh_from_db()
+        self.assertIn('edited', post.image.name)
+        self.assertEqual(self.thumbnail_count(), 2 * presets)
+
+
+@override_settings(THUMBNAIL_WORKERS=1)
+class ThumbnailExecutorTest(SimpleTestCase):
+    def setUp(self):
+        thumbnails._executor = None
+        self.addCleanup(self.shutdown)
+
+    def shutdown(self):
+        if thumbnails._executor is not None:
+            thumbnails._executor.shutdown()
+        thumbnails._executor = None
+
+    def test_tasks_run_in_worker_process(self):
+        """Задачи выполняются в отдельном процессе"""
+        future = thumbnails._submit(os.getpid)
+        self.assertNotEqual(future.result(timeout=30), os.getpid())
+
+    def test_broken_pool_is_replaced(self):
+        """После падения процесса пул пересоздаётся и задачи идут дальше"""
+        crashed = thumbnails._submit(os._exit, 1)
+        with self.assertRaises(BrokenProcessPool):
+            crashed.result(timeout=30)
+        broken = thumbnails._executor
+        future = thumbnails._submit(os.getpid)
+        self.assertNotEqual(future.result(timeout=30), os.getpid())
+        self.assertIsNot(thumbnails._executor, broken)
+        broken.shutdown()
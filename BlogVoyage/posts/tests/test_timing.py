@@ -0,0 +1,66 @@
+import json
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+
+from ..models import Post
+
+User = get_user_model()
+
+
+@override_settings(SERVER_TIMING_HEADER=True)
+class ServerTimingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='timer')
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def metrics(self, response):
+        return {
+            name: float(duration)
+            for name, duration in re.findall(
+                r'(\w+);dur=([\d.]+)', response['Server-Timing']
+            )
+        }
+
+    def test_header_reports_costs(self):
+        """Заголовок содержит время запроса, представления, базы и шаблонов"""
+        response = self.client.get('/')
+        metrics = self.metrics(response)
+        self.assertEqual(set(metrics), {'total', 'view', 'db', 'tpl'})
+        self.assertGreater(metrics['tpl'], 0)
+        self.assertLessEqual(metrics['view'], metrics['total'])
+        queries = int(re.search(
+            r'db;dur=[\d.]+;desc="(\d+) queries"', response['Server-Timing']
+        ).group(1))
+        self.assertGreater(queries, 0)
+
+    def test_log_line(self):
+        """Каждый запрос пишет в журнал строку JSON"""
+        with self.assertLogs('core.timing', 'INFO') as logs:
+            self.client.get(f'/profile/{self.user.username}/')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['path'], f'/profile/{self.user.username}/')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+        self.assertIn('tpl_ms', record)
+
+    @override_settings(SERVER_TIMING_HEADER=False)
+    def test_header_can_be_disabled(self):
+        """Без настройки заголовок видят только сотрудники, журнал
+        остаётся"""
+        with self.assertLogs('core.timing', 'INFO'):
+            response = self.client.get('/')
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.client.force_login(self.user)
+        self.assertFalse(self.client.get('/').has_header('Server-Timing'))
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        self.assertTrue(self.client.get('/').has_header('Server-Timing'))
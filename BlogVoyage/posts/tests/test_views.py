@@ -1,12 +1,21 @@
+import threading
+import time
+
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.db import connection, transaction
+from django.test import (Client, RequestFactory, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from BlogVoyage.settings import POSTS_PER_PAGE
+from BlogVoyage.settings import COMMENTS_PER_PAGE, POSTS_PER_PAGE
+from core.replica import STICKY_COOKIE
 
+from ..caching import PAGE_LOCK_KEY, bump, get_generations, page_id
 from ..forms import CommentForm, PostForm
-from ..models import Comment, Group, Post
+from ..models import Comment, Follow, Group, Post
 
 User = get_user_model()
 
@@ -255,6 +264,7 @@ class PostsCreationTests(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
 
     def test_group1_contains_only_group_posts(self):
@@ -326,6 +336,7 @@ class CommentCreationTest(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.user_client = Client()
         self.user_client.force_login(self.user)
         self.guest_client = Client()
@@ -407,6 +418,61 @@ class CommentCreationTest(TestCase):
         self.assertEqual(comments[0].text, 'Комментарий')
 
 
+class CommentPaginationTest(TestCase):
+    NUM_OF_COMMENTS = COMMENTS_PER_PAGE + 5
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.post = Post.objects.create(
+            author=User.objects.create_user(username='popular'),
+            text='Популярный пост',
+        )
+        for number in range(cls.NUM_OF_COMMENTS):
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.create_user(username=f'reader{number}'),
+                text=f'Комментарий {number}',
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_post_detail_shows_first_comments_page(self):
+        """Страница поста выводит первую страницу комментариев
+        по порядку создания, не запрашивая авторов по одному"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(
+                reverse('posts:post_detail', args=(self.post.id,))
+            )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_PER_PAGE)
+        self.assertEqual(comments[0].text, 'Комментарий 0')
+        self.assertTrue(comments.has_next())
+        self.assertLess(len(queries), 10)
+        self.assertContains(response, 'Показать ещё комментарии')
+
+    def test_more_comments_endpoint_returns_rest(self):
+        """Фрагмент с комментариями догружает оставшиеся комментарии"""
+        response = self.guest_client.get(
+            reverse('posts:post_detail', args=(self.post.id,))
+        )
+        cursor = response.context['comments'].next_cursor()
+        response = self.guest_client.get(
+            reverse('posts:post_comments', args=(self.post.id,)),
+            {'after': cursor}
+        )
+        self.assertTemplateUsed(response, 'includes/comments.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        texts = [comment.text for comment in response.context['comments']]
+        self.assertEqual(texts, [
+            f'Комментарий {number}'
+            for number in range(COMMENTS_PER_PAGE, self.NUM_OF_COMMENTS)
+        ])
+        self.assertNotContains(response, 'Показать ещё комментарии')
+
+
 class CacheTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -426,13 +492,265 @@ class CacheTest(TestCase):
         # Изначальная проверка наличия поста
         inital_response = self.guest_client.get(reverse('posts:index'))
         self.assertIn(self.post.text, inital_response.content.decode())
-        self.post.delete()
-        # Проврка наличия поста даже после удаления
-        after_del_resp = self.guest_client.get(reverse('posts:index'))
-        self.assertIn(self.post.text, after_del_resp.content.decode())
-        self.assertEqual(inital_response.content, after_del_resp.content)
+        # Изменение в обход сигналов не сбрасывает кэш
+        Post.objects.filter(pk=self.post.pk).update(text='changed')
+        cached_resp = self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(inital_response.content, cached_resp.content)
         cache.clear()
-        # Исчезновение поста после очистки кэша
+        # Появление нового текста после очистки кэша
         after_clear_resp = self.guest_client.get(reverse('posts:index'))
         self.assertNotIn(self.post.text, after_clear_resp.content.decode())
-        self.assertNotEqual(after_clear_resp.content, after_del_resp.content)
+        self.assertIn('changed', after_clear_resp.content.decode())
+        self.assertNotEqual(after_clear_resp.content, cached_resp.content)
+
+    def test_author_rename_reaches_cached_pages(self):
+        """Новое имя автора сразу видно на закэшированных страницах"""
+        post = Post.objects.first()
+        author = post.author
+        pages = [
+            reverse('posts:index'),
+            reverse('posts:post_detail', args=[post.pk]),
+        ]
+        for url in pages:
+            self.guest_client.get(url)
+        author.first_name = 'Переименованный'
+        author.save()
+        for url in pages:
+            with self.subTest(url=url):
+                self.assertContains(
+                    self.guest_client.get(url), 'Переименованный'
+                )
+
+    def test_post_page_shows_fresh_author_counters(self):
+        """Новый пост и подписка обновляют счётчики автора на странице
+        другого его поста"""
+        post = Post.objects.first()
+        url = reverse('posts:post_detail', args=[post.pk])
+        counters = post.author.counters
+        self.guest_client.get(url)
+        Post.objects.create(author=post.author, text='Ещё один пост')
+        follower = User.objects.create_user(username='follower')
+        Follow.objects.create(user=follower, author=post.author)
+        response = self.guest_client.get(url)
+        counters.refresh_from_db()
+        self.assertContains(
+            response, f'<span>{counters.posts_count}</span>'
+        )
+        self.assertContains(
+            response, f'<span>{counters.followers_count}</span>'
+        )
+        self.assertEqual(counters.followers_count, 1)
+
+    def test_cache_is_invalidated_by_signals(self):
+        """Удаление поста и новый комментарий сразу сбрасывают
+        кэш страниц, на которых они выводятся"""
+        post = Post.objects.create(
+            author=self.author_user,
+            text='post_to_delete',
+        )
+        post_page = reverse('posts:post_detail', args=(post.id,))
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=(self.author_user,)),
+        )
+        for page in pages:
+            self.guest_client.get(page)
+        self.guest_client.get(post_page)
+        Comment.objects.create(
+            post=post,
+            author=self.author_user,
+            text='Свежий комментарий'
+        )
+        response = self.guest_client.get(post_page)
+        self.assertIn('Свежий комментарий', response.content.decode())
+        post.delete()
+        for page in pages:
+            with self.subTest(page=page):
+                response = self.guest_client.get(page)
+                self.assertNotIn('post_to_delete', response.content.decode())
+
+    def test_conditional_get(self):
+        """Повторный запрос с актуальным ETag получает 304 без запросов
+        к базе, после изменения данных — новую страницу"""
+        group = Group.objects.create(title='Группа', slug='etag')
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(group.slug,)),
+            reverse('posts:profile', args=(self.author_user,)),
+            reverse('posts:post_detail', args=(self.post.id,)),
+        )
+        for page in pages:
+            with self.subTest(page=page):
+                etag = self.guest_client.get(page)['ETag']
+                with self.assertNumQueries(0):
+                    response = self.guest_client.get(
+                        page, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+        etag = self.guest_client.get(pages[0])['ETag']
+        Post.objects.create(author=self.author_user, text='Новый пост')
+        response = self.guest_client.get(pages[0], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class BumpAfterCommitTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_generation_changes_again_after_commit(self):
+        """Поколение, увиденное до COMMIT, после фиксации устаревает"""
+        with transaction.atomic():
+            bump('index')
+            before_commit = get_generations(['index'])
+        self.assertNotEqual(get_generations(['index']), before_commit)
+
+
+class PageStampedeTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        Post.objects.create(author=cls.author, text='Старый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('posts:index')
+        request = RequestFactory().get(self.url)
+        request.user = AnonymousUser()
+        self.lock = PAGE_LOCK_KEY.format(page_id(request))
+
+    def rebuild_elsewhere(self):
+        # Блокировку держит другой процесс, который собирает страницу
+        cache.add(self.lock, True)
+        self.addCleanup(cache.delete, self.lock)
+
+    def test_stale_copy_is_served_while_page_is_rebuilt(self):
+        """Пока страницу собирает другой процесс, отдаётся прежняя копия
+        без запросов к базе, затем — новая"""
+        old = Client().get(self.url)
+        Post.objects.create(author=self.author, text='Новый пост')
+        self.rebuild_elsewhere()
+        with self.assertNumQueries(0):
+            response = Client().get(self.url)
+        self.assertNotContains(response, 'Новый пост')
+        self.assertEqual(response['ETag'], old['ETag'])
+        cache.delete(self.lock)
+        self.assertContains(Client().get(self.url), 'Новый пост')
+
+    @override_settings(PAGE_LOCK_WAIT=0)
+    def test_writer_does_not_get_stale_copy(self):
+        """Браузер, который только что писал, не получает прежнюю копию"""
+        Client().get(self.url)
+        Post.objects.create(author=self.author, text='Новый пост')
+        self.rebuild_elsewhere()
+        client = Client()
+        client.cookies[STICKY_COOKIE] = '1'
+        self.assertContains(client.get(self.url), 'Новый пост')
+
+    @override_settings(PAGE_LOCK_WAIT=30)
+    def test_wait_ends_when_lock_is_released(self):
+        """Если сборщик снял блокировку, не положив страницу в кэш,
+        ожидающий запрос собирает её сам, не дожидаясь PAGE_LOCK_WAIT"""
+        Client().get(self.url)
+        Post.objects.create(author=self.author, text='Новый пост')
+        self.rebuild_elsewhere()
+        release = threading.Timer(0.2, cache.delete, [self.lock])
+        release.start()
+        self.addCleanup(release.cancel)
+        client = Client()
+        client.cookies[STICKY_COOKIE] = '1'
+        started = time.monotonic()
+        self.assertContains(client.get(self.url), 'Новый пост')
+        self.assertLess(time.monotonic() - started, 5)
+
+    def test_page_is_rebuilt_early_with_probability(self):
+        """Свежая запись пересобирается заранее только при большом
+        коэффициенте досрочной пересборки"""
+        client = Client()
+        client.get(self.url)
+        with override_settings(PAGE_EARLY_BETA=0), self.assertNumQueries(0):
+            client.get(self.url)
+        with override_settings(PAGE_EARLY_BETA=10 ** 9):
+            with CaptureQueriesContext(connection) as queries:
+                client.get(self.url)
+        self.assertGreater(len(queries), 0)
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='carded', first_name='Иван', last_name='Карточкин'
+        )
+        cls.group = Group.objects.create(
+            title='Группа карточек',
+            slug='cards',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.post = Post.objects.create(
+            author=self.author, text='Пост в карточке', group=self.group
+        )
+
+    def index(self):
+        # Кэш страницы сбрасываем, чтобы проверить именно кэш карточек
+        bump('index')
+        return self.guest_client.get(reverse('posts:index'))
+
+    def test_cards_are_cached_between_renders(self):
+        """Повторная отрисовка ленты не рендерит карточки заново"""
+        self.index()
+        with self.assertTemplateNotUsed('posts/includes/post_list.html'):
+            response = self.index()
+        self.assertContains(response, 'Пост в карточке')
+
+    def test_cards_are_invalidated_by_related_changes(self):
+        """Карточка перерисовывается при изменении поста, автора,
+        группы и числа комментариев"""
+        self.index()
+        changes = (
+            (lambda: setattr(self.author, 'first_name', 'Пётр')
+             or self.author.save(), 'Пётр'),
+            (lambda: setattr(self.group, 'slug', 'new_cards')
+             or self.group.save(), '/group/new_cards/'),
+            (lambda: Comment.objects.create(
+                post=self.post, author=self.author, text='Комментарий'
+            ), 'комментариев: 1'),
+            (lambda: setattr(self.post, 'text', 'Новый текст')
+             or self.post.save(), 'Новый текст'),
+        )
+        for change, expected in changes:
+            with self.subTest(expected=expected):
+                change()
+                self.assertContains(self.index(), expected)
+
+    def test_group_and_profile_pages_use_cards(self):
+        """Ленты сообщества и профиля тоже берут карточки из кэша"""
+        group = Group.objects.get(pk=self.group.pk)
+        for url, template in (
+            (reverse('posts:group_list', args=[group.slug]),
+             'posts/includes/group_post_card.html'),
+            (reverse('posts:profile', args=[self.author.username]),
+             'posts/includes/profile_post_card.html'),
+        ):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertTemplateUsed(response, template)
+                self.assertContains(response, 'Пост в карточке')
+                # Сбрасываем кэш страницы, но не карточек
+                bump(f'group:{group.slug}', f'profile:{self.author.username}')
+                with self.assertTemplateNotUsed(template):
+                    self.guest_client.get(url)
+
+    def test_login_keeps_author_cards(self):
+        """Вход автора не сбрасывает его карточки"""
+        self.index()
+        Client().force_login(self.author)
+        with self.assertTemplateNotUsed('posts/includes/post_list.html'):
+            self.index()
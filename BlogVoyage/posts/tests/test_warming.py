@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..models import Group, Post, UserCounters
+from ..warming import targets
+
+User = get_user_model()
+
+
+@override_settings(POSTS_PER_PAGE=2)
+class CacheWarmingTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        content = BytesIO()
+        Image.new('RGB', (40, 30), 'teal').save(content, 'PNG')
+        image = default_storage.save(
+            'posts/warm.png', ContentFile(content.getvalue())
+        )
+        self.group = Group.objects.create(title='Группа', slug='warm')
+        self.author = User.objects.create_user(username='active')
+        User.objects.create_user(username='quiet')
+        for number in range(5):
+            Post.objects.create(
+                author=self.author, group=self.group, text=f'Пост {number}',
+                image=image if number == 4 else ''
+            )
+        UserCounters.objects.filter(user=self.author).update(posts_count=5)
+
+    def test_targets_cover_index_pages_groups_and_profiles(self):
+        """В прогрев попадают первые страницы главной, все сообщества
+        и профили самых активных авторов"""
+        urls, images = targets(pages=2, profiles=1)
+        index = reverse('posts:index')
+        self.assertEqual(urls[0], index)
+        self.assertTrue(urls[1].startswith(f'{index}?after='))
+        self.assertEqual(urls[2:], [
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+        ])
+        self.assertEqual(images, ['posts/warm.png'])
+
+    def test_pages_stop_at_last_feed_page(self):
+        """Если страниц в ленте меньше запрошенного, прогреваются только
+        существующие, без повторов"""
+        urls, _ = targets(pages=10, profiles=0)
+        index = reverse('posts:index')
+        pages = [url for url in urls if url.startswith(index + '?')]
+        self.assertEqual(len(pages), 2)
+        self.assertEqual(len(set(urls)), len(urls))
+
+    def test_warmed_pages_are_served_from_cache(self):
+        """После прогрева страницы отдаются без запросов к базе,
+        а миниатюры уже построены"""
+        call_command(
+            'warm_cache', pages=2, profiles=1, workers=2, stdout=StringIO()
+        )
+        for url in targets(pages=2, profiles=1)[0]:
+            with self.subTest(url=url):
+                with self.assertNumQueries(0):
+                    response = Client().get(url)
+                self.assertEqual(response.status_code, 200)
+        thumbnails = [
+            name for _, _, names in os.walk(
+                os.path.join(self.media_root, 'cache')
+            ) for name in names
+        ]
+        self.assertTrue(thumbnails)
@@ -0,0 +1,97 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _init_worker():
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+    # Соединения родительского процесса использовать нельзя
+    connections.close_all()
+
+
+def render_thumbnails(name):
+    """Строит все миниатюры, которые используют шаблоны, для одного файла.
+
+    sorl сохраняет результат в своём key-value хранилище, поэтому
+    тег thumbnail при отрисовке страницы не будет менять размер картинки.
+    """
+    from sorl.thumbnail import get_thumbnail
+
+    for geometry, options in settings.THUMBNAIL_PRESETS:
+        get_thumbnail(name, geometry, **options)
+    return name
+
+
+def get_executor(workers=None):
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=workers or settings.THUMBNAIL_WORKERS or 1,
+            initializer=_init_worker,
+        )
+    return _executor
+
+
+def remove_orphaned_images(names):
+    """Удаляет картинки постов вместе с миниатюрами, если на файл больше
+    не ссылается ни один пост."""
+    from sorl.thumbnail import delete
+
+    from .models import Post
+
+    used = set(
+        Post.objects.filter(image__in=names).values_list('image', flat=True)
+    )
+    removed = [
+        name for name in names
+        if name not in used and name.startswith('posts/')
+    ]
+    for name in removed:
+        delete(name)
+    return removed
+
+
+def _log_failure(future):
+    error = future.exception()
+    if error is not None:
+        logger.error('Фоновая обработка картинок не удалась: %s', error)
+
+
+def _submit(function, *args):
+    global _executor
+    if not settings.THUMBNAIL_WORKERS:
+        return function(*args)
+    try:
+        future = get_executor().submit(function, *args)
+    except BrokenProcessPool:
+        _executor = None
+        future = get_executor().submit(function, *args)
+    future.add_done_callback(_log_failure)
+    return future
+
+
+def submit(name):
+    return _submit(render_thumbnails, name)
+
+
+def queue_thumbnails(post):
+    if post.image:
+        name = post.image.name
+        transaction.on_commit(lambda: submit(name))
+
+
+def queue_image_cleanup(names):
+    names = [name for name in names if name]
+    if names:
+        transaction.on_commit(lambda: _submit(remove_orphaned_images, names))
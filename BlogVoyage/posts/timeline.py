@@ -0,0 +1,166 @@
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F, Q
+
+from . import follow_graph
+from .models import Follow, Post, Timeline, UserCounters
+
+HOT_AUTHORS_KEY = 'timeline:hot_authors'
+TIMELINE_FIELDS = ('pub_date', 'post_id')
+POST_FIELDS = ('pub_date', 'pk')
+
+
+def hot_authors():
+    """Авторы, чьи посты не раскладываются по лентам подписчиков,
+    а подмешиваются в ленту при чтении. Список читается с основной
+    базы, чтобы в кэш не попал снятый с отставшей реплики."""
+    authors = cache.get(HOT_AUTHORS_KEY)
+    if authors is None:
+        authors = frozenset(
+            UserCounters.objects.using('default').filter(
+                followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+            ).values_list('user_id', flat=True)
+        )
+        cache.set(
+            HOT_AUTHORS_KEY, authors, settings.TIMELINE_HOT_AUTHORS_TIME
+        )
+    return authors
+
+
+def fan_out(post):
+    followers_count = UserCounters.objects.filter(
+        user_id=post.author_id
+    ).values_list('followers_count', flat=True).first() or 0
+    if followers_count > settings.TIMELINE_FANOUT_LIMIT:
+        if post.author_id not in hot_authors():
+            cache.delete(HOT_AUTHORS_KEY)
+        return
+    Timeline.objects.bulk_create(
+        [
+            Timeline(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in Follow.objects.filter(
+                author_id=post.author_id
+            ).values_list('user_id', flat=True)
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def _insert_entries(select_sql, params):
+    # Записи ленты вставляются одним INSERT ... SELECT внутри базы,
+    # без загрузки строк в Python
+    ops = connection.ops
+    sql = (
+        f'{ops.insert_statement(ignore_conflicts=True)} '
+        f'{Timeline._meta.db_table} (user_id, post_id, pub_date) '
+        f'{select_sql} {ops.ignore_conflicts_suffix_sql(True)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def fan_out_many(post_ids):
+    """То же, что fan_out, для пачки постов, вставленных без сигналов."""
+    post_ids = list(post_ids)
+    hot = list(hot_authors()) or [0]
+    _insert_entries(
+        f'SELECT follow.user_id, post.id, post.pub_date '
+        f'FROM {Post._meta.db_table} post '
+        f'JOIN {Follow._meta.db_table} follow '
+        f'ON follow.author_id = post.author_id '
+        f'WHERE post.id IN ({_placeholders(post_ids)}) '
+        f'AND post.author_id NOT IN ({_placeholders(hot)})',
+        post_ids + hot,
+    )
+
+
+def backfill_many(pairs):
+    """То же, что backfill, для пачки подписок (читатель, автор).
+
+    Возвращает число вставленных записей.
+    """
+    pairs = list(pairs)
+    posts = Post._meta.db_table
+    return _insert_entries(
+        f'WITH pairs (user_id, author_id) AS (VALUES '
+        f'{", ".join(["(%s, %s)"] * len(pairs))}) '
+        f'SELECT pairs.user_id, post.id, post.pub_date FROM pairs '
+        f'JOIN {posts} post ON post.id IN ('
+        f'SELECT recent.id FROM {posts} recent '
+        f'WHERE recent.author_id = pairs.author_id '
+        f'ORDER BY recent.pub_date DESC, recent.id DESC LIMIT %s)',
+        [value for pair in pairs for value in pair]
+        + [settings.TIMELINE_BACKFILL],
+    )
+
+
+def backfill(user_id, author_id):
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-pk'
+    ).values_list('pk', 'pub_date')[:settings.TIMELINE_BACKFILL]
+    Timeline.objects.bulk_create(
+        [
+            Timeline(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in posts
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def cool_down(author_ids, batch_size=400):
+    """Раскладывает по лентам посты авторов, переставших быть «горячими».
+
+    Пока у автора было больше TIMELINE_FANOUT_LIMIT подписчиков, его
+    посты в ленты не попадали и подмешивались при чтении; без этого
+    они пропали бы из лент подписчиков. Подписчик получает те же
+    последние TIMELINE_BACKFILL постов, что и при новой подписке.
+    """
+    author_ids = list(author_ids)
+    if not author_ids:
+        return
+    cache.delete(HOT_AUTHORS_KEY)
+    pairs = Follow.objects.filter(author_id__in=author_ids).values_list(
+        'user_id', 'author_id'
+    ).iterator()
+    while True:
+        batch = list(islice(pairs, batch_size))
+        if not batch:
+            return
+        backfill_many(batch)
+
+
+def prune(user_id, author_id):
+    Timeline.objects.filter(
+        user_id=user_id,
+        post__in=Post.objects.filter(author_id=author_id).values('pk')
+    ).delete()
+
+
+def follow_feed(user):
+    """Источник ленты подписок и поля ключа для курсорной пагинации.
+
+    Обычно это готовый отсортированный срез таблицы Timeline; если среди
+    отслеживаемых авторов есть «горячие», их посты читаются напрямую.
+    """
+    followed_hot = follow_graph.followed_among(user.pk, hot_authors())
+    if not followed_hot:
+        entries = Timeline.objects.filter(user=user).select_related(
+            'post__author', 'post__group'
+        )
+        return entries, TIMELINE_FIELDS
+    # «+ 0» не даёт SQLite разбить OR на два поиска по индексам с
+    # сортировкой результата: посты читаются по индексу даты,
+    # и LIMIT страницы останавливает проход
+    posts = Post.objects.annotate(author_key=F('author_id') + 0).filter(
+        Q(pk__in=Timeline.objects.filter(user=user).values('post_id'))
+        | Q(author_key__in=followed_hot)
+    ).select_related('author', 'group')
+    return posts, POST_FIELDS
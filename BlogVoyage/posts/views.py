@@ -1,24 +1,48 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.core.exceptions import PermissionDenied
+from django.db import IntegrityError, transaction
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
 
-from BlogVoyage.settings import CACHE_TIME, POSTS_PER_PAGE
+from BlogVoyage.settings import CACHE_TIME, COMMENTS_PER_PAGE, POSTS_PER_PAGE
+from core.replica import replica_reads
 
+from .caching import cache_page_versioned, post_scopes
+from .exporting import FORMATS, export_lines
+from .feeds import AuthorFeed, GroupFeed, LatestPostsFeed, atom
+from .follow_graph import is_following
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post
+from .models import Comment, Follow, Group, Post
+from .paginator import CursorPaginator
+from .search import SearchPaginator
+from .thumbnails import queue_thumbnails
+from .timeline import follow_feed
 
 User = get_user_model()
 
 
-def get_page(request, post_list):
-    paginator = Paginator(post_list, POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+def get_page(request, post_list, fields=('pub_date', 'pk')):
+    paginator = CursorPaginator(post_list, POSTS_PER_PAGE, fields)
+    return paginator.get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        number=request.GET.get('page'),
+    )
+
+
+def get_comments_page(request, post_id):
+    paginator = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        COMMENTS_PER_PAGE,
+        fields=('created', 'pk'),
+        descending=False,
+    )
+    return paginator.get_page(after=request.GET.get('after'))
 
 
-@cache_page(CACHE_TIME, key_prefix='index_page')
+@cache_page_versioned(CACHE_TIME, lambda: ('index',))
+@replica_reads
 def index(request):
     template = 'posts/index.html'
     post_list = Post.objects.all().select_related('author', 'group')
@@ -33,10 +57,47 @@ def index(request):
     return render(request, template, context)
 
 
+index_feed = cache_page_versioned(CACHE_TIME, lambda: ('index',))(
+    replica_reads(LatestPostsFeed())
+)
+index_atom_feed = cache_page_versioned(CACHE_TIME, lambda: ('index',))(
+    replica_reads(atom(LatestPostsFeed)())
+)
+group_feed = cache_page_versioned(
+    CACHE_TIME, lambda slug: (f'group:{slug}',)
+)(replica_reads(GroupFeed()))
+group_atom_feed = cache_page_versioned(
+    CACHE_TIME, lambda slug: (f'group:{slug}',)
+)(replica_reads(atom(GroupFeed)()))
+profile_feed = cache_page_versioned(
+    CACHE_TIME, lambda username: (f'profile:{username}',)
+)(replica_reads(AuthorFeed()))
+profile_atom_feed = cache_page_versioned(
+    CACHE_TIME, lambda username: (f'profile:{username}',)
+)(replica_reads(atom(AuthorFeed)()))
+
+
+def search(request):
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    page_obj = SearchPaginator(query, POSTS_PER_PAGE).get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    context = {
+        'page_obj': page_obj,
+        'query': query,
+        'title': 'Поиск по записям',
+    }
+    return render(request, template, context)
+
+
+@cache_page_versioned(CACHE_TIME, lambda slug: (f'group:{slug}',))
+@replica_reads
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = group.posts.select_related('author', 'group')
     page_obj = get_page(request, posts)
     context = {
         'group': group,
@@ -45,17 +106,17 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@cache_page_versioned(
+    CACHE_TIME, lambda username: (f'profile:{username}',)
+)
+@replica_reads
 def profile(request, username):
     template = 'posts/profile.html'
-    author = get_object_or_404(User.objects.filter(username=username))
-    page_obg = get_page(request, author.posts.all())
-    following = False
-    if not request.user.is_anonymous:
-        if Follow.objects.filter(
-            user=request.user,
-            author=author
-        ).exists():
-            following = True
+    author = get_object_or_404(
+        User.objects.select_related('counters'), username=username
+    )
+    page_obg = get_page(request, author.posts.select_related('group'))
+    following = is_following(request.user.pk, author.pk)
     context = {
         'page_obj': page_obg,
         'author': author,
@@ -64,13 +125,34 @@ def profile(request, username):
     return render(request, template, context)
 
 
+@login_required
+def profile_export(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user and not request.user.is_staff:
+        raise PermissionDenied
+    export_format = request.GET.get('format', 'jsonl')
+    if export_format not in FORMATS:
+        export_format = 'jsonl'
+    response = StreamingHttpResponse(
+        export_lines(author, export_format, request.build_absolute_uri),
+        content_type=FORMATS[export_format][1],
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{author.username}.{export_format}"'
+    )
+    return response
+
+
+@cache_page_versioned(CACHE_TIME, post_scopes)
+@replica_reads
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
     post = get_object_or_404(
-        Post.objects.select_related('author', 'group'), id=post_id
+        Post.objects.select_related('author__counters', 'group'),
+        id=post_id
     )
     form = CommentForm(request.POST or None)
-    comments = post.comments.all()
+    comments = get_comments_page(request, post.id)
     context = {
         'post': post,
         'form': form,
@@ -79,6 +161,18 @@ def post_detail(request, post_id):
     return render(request, template, context)
 
 
+@cache_page_versioned(CACHE_TIME, lambda post_id: (f'post:{post_id}',))
+@replica_reads
+def post_comments(request, post_id):
+    template = 'includes/comments.html'
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    context = {
+        'post': post,
+        'comments': get_comments_page(request, post.id),
+    }
+    return render(request, template, context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -90,6 +184,7 @@ def post_create(request):
             post = form.save(commit=False)
             post.author = request.user
             post.save()
+            queue_thumbnails(post)
             return redirect('posts:profile', username=post.author)
 
     template = 'posts/create_post.html'
@@ -117,7 +212,9 @@ def post_edit(request, post_id):
 
     if request.method == 'POST':
         if form.is_valid():
-            form.save()
+            post = form.save()
+            if 'image' in form.changed_data:
+                queue_thumbnails(post)
             return redirect('posts:post_detail', post_id=post.id)
 
     context = {
@@ -141,12 +238,13 @@ def add_comment(request, post_id):
 
 
 @login_required
+@replica_reads
 def follow_index(request):
     template = 'posts/follow.html'
-    post_list = Post.objects.filter(
-        author__following__user=request.user
-    )
-    page_obj = get_page(request, post_list)
+    post_list, fields = follow_feed(request.user)
+    page_obj = get_page(request, post_list, fields)
+    if post_list.model is not Post:
+        page_obj.object_list = [entry.post for entry in page_obj]
     context = {
         'page_obj': page_obj,
         'follow': True,
@@ -158,26 +256,20 @@ def follow_index(request):
 def profile_follow(request, username):
     user = request.user
     author = get_object_or_404(User, username=username)
-    if Follow.objects.filter(user=user, author=author).exists():
-        return redirect('posts:follow_index')
-    if user != author:
-        follow = Follow(
-            user=user,
-            author=author,
-        )
-        follow.save()
+    if user != author and not is_following(user.pk, author.pk):
+        try:
+            with transaction.atomic():
+                Follow.objects.create(user=user, author=author)
+        except IntegrityError:
+            # Подписка уже создана параллельным запросом
+            pass
     return redirect('posts:follow_index')
 
 
 @login_required
 def profile_unfollow(request, username):
-    follow = get_object_or_404(
-        Follow,
-        user=request.user,
-        author=get_object_or_404(
-            User,
-            username=username,
-        ),
-    )
-    follow.delete()
+    author = get_object_or_404(User, username=username)
+    if not is_following(request.user.pk, author.pk):
+        raise Http404
+    Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:follow_index')
@@ -0,0 +1,129 @@
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+from .models import Group, Post, UserCounters
+from .paginator import CursorPaginator
+from .thumbnails import render_thumbnails
+
+logger = logging.getLogger(__name__)
+
+
+def _feed_pages(url, queryset, pages):
+    """Адреса первых ``pages`` страниц ленты и картинки их постов.
+
+    Курсоры берутся тем же пагинатором, что и в представлениях, поэтому
+    адреса совпадают со ссылками «дальше» на страницах.
+    """
+    paginator = CursorPaginator(
+        queryset.only('pk', 'pub_date', 'image'), settings.POSTS_PER_PAGE
+    )
+    cursor = None
+    for _ in range(pages):
+        page = paginator.page(after=cursor)
+        yield (
+            url if cursor is None else f'{url}?after={cursor}',
+            [post.image.name for post in page if post.image],
+        )
+        if not page.has_next():
+            return
+        cursor = page.next_cursor()
+
+
+def targets(pages, profiles):
+    """Адреса страниц для прогрева и имена картинок на них.
+
+    Первые ``pages`` страниц главной, первая страница каждого
+    сообщества и профили ``profiles`` авторов с наибольшим числом
+    постов.
+    """
+    feeds = [(reverse('posts:index'), Post.objects.all(), pages)]
+    for slug in Group.objects.order_by('pk').values_list('slug', flat=True):
+        feeds.append((
+            reverse('posts:group_list', args=[slug]),
+            Post.objects.filter(group__slug=slug), 1,
+        ))
+    authors = UserCounters.objects.filter(posts_count__gt=0).order_by(
+        '-posts_count'
+    ).values_list('user_id', 'user__username')[:profiles]
+    for author_id, username in authors:
+        feeds.append((
+            reverse('posts:profile', args=[username]),
+            Post.objects.filter(author_id=author_id), 1,
+        ))
+    urls = []
+    images = set()
+    for url, queryset, count in feeds:
+        for page_url, names in _feed_pages(url, queryset, count):
+            urls.append(page_url)
+            images.update(names)
+    return urls, sorted(images)
+
+
+def _fetch(url):
+    try:
+        response = Client().get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f'{url} ответил {response.status_code}')
+        return url
+    finally:
+        # Соединения потоков пула не переиспользуются между задачами
+        connections.close_all()
+
+
+def _thumbnail(name):
+    try:
+        return render_thumbnails(name)
+    finally:
+        connections.close_all()
+
+
+def warm(pages=5, profiles=50, workers=4, progress=None):
+    """Заполняет кэш страниц и миниатюр после перезапуска.
+
+    Сначала строятся миниатюры, чтобы отрисовка страниц их не ждала,
+    затем анонимным клиентом запрашиваются сами страницы: они проходят
+    весь цикл запроса и попадают в кэш под теми же ключами, что и у
+    посетителей. Число одновременных запросов ограничено ``workers``.
+    ``progress`` вызывается после каждой задачи с названием шага и
+    числом выполненных на нём задач.
+    """
+    urls, images = targets(pages, profiles)
+    done = Counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for label, function, items in (
+            ('Миниатюры', _thumbnail, images),
+            ('Страницы', _fetch, urls),
+        ):
+            for future in [pool.submit(function, item) for item in items]:
+                error = future.exception()
+                if error is not None:
+                    done['Ошибки'] += 1
+                    logger.warning('Прогрев кэша: %s', error)
+                    continue
+                done[label] += 1
+                if progress is not None:
+                    progress(label, done[label])
+    return dict(done)
+
+
+def warm_in_background():
+    """Прогрев в фоновом потоке, чтобы не задерживать запуск сервера."""
+    thread = threading.Thread(
+        target=warm,
+        kwargs={
+            'pages': settings.WARM_CACHE_PAGES,
+            'profiles': settings.WARM_CACHE_PROFILES,
+            'workers': settings.WARM_CACHE_WORKERS,
+        },
+        name='warm-cache',
+        daemon=True,
+    )
+    thread.start()
+    return thread
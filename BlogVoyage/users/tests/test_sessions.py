@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.auth import USER_KEY
+from core.sessions import SessionStore
+
+User = get_user_model()
+
+
+class CachedSessionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='reader', password='old-Passw0rd'
+        )
+        self.client = Client()
+        self.client.login(username='reader', password='old-Passw0rd')
+
+    def test_logged_in_request_skips_session_and_user_queries(self):
+        """Сессия и пользователь повторного запроса берутся из кэша"""
+        url = reverse('posts:follow_index')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(response.context['user'], self.user)
+        tables = ' '.join(query['sql'] for query in captured.captured_queries)
+        self.assertNotIn('django_session', tables)
+        self.assertNotIn('"auth_user"."password"', tables)
+
+    def test_cached_user_has_no_password_hash(self):
+        """В кэш пользователя хэш пароля не попадает"""
+        self.client.get(reverse('posts:follow_index'))
+        entry = cache.get(USER_KEY.format(self.user.pk))
+        self.assertIsNotNone(entry)
+        self.assertNotIn(self.user.password, repr(entry))
+
+    def test_password_change_invalidates_cached_user(self):
+        """После смены пароля текущая сессия остаётся, другие
+        сессии пользователя завершаются"""
+        other = Client()
+        other.login(username='reader', password='old-Passw0rd')
+        follow_url = reverse('posts:follow_index')
+        self.assertEqual(other.get(follow_url).status_code, 200)
+        response = self.client.post(
+            reverse('users:password_change_form'),
+            {
+                'old_password': 'old-Passw0rd',
+                'new_password1': 'new-Passw0rd',
+                'new_password2': 'new-Passw0rd',
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.client.get(follow_url).status_code, 200)
+        self.assertEqual(other.get(follow_url).status_code, 302)
+
+    def test_session_is_written_behind(self):
+        """Повторные сохранения в пределах интервала идут только в кэш"""
+        session = SessionStore()
+        session['step'] = 1
+        session.create()
+        session['step'] = 2
+        session.save()
+        row = Session.objects.get(session_key=session.session_key)
+        self.assertEqual(row.get_decoded()['step'], 1)
+        self.assertEqual(
+            SessionStore(session.session_key).load()['step'], 2
+        )
+        session.delete()
+        self.assertFalse(
+            Session.objects.filter(session_key=session.session_key).exists()
+        )
+        self.assertEqual(SessionStore(session.session_key).load(), {})